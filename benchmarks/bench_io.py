@@ -0,0 +1,114 @@
+"""
+Benchmarks for reading and writing records and annotations, on
+synthetic files in every dat format.
+
+Run with the benchmark runner, from the base directory of the
+repository:
+
+    python -m benchmarks.run --filter bench_io
+
+"""
+import shutil
+import tempfile
+
+import wfdb
+
+from benchmarks import synthetic
+
+
+# 100 seconds and 1 hour at 360Hz
+SIG_LENS = [36000, 1296000]
+
+
+class RdRecord(object):
+    """
+    Read records with one or four channels, whose first channel has
+    one or four samples per frame.
+    """
+    params = [synthetic.DAT_FMTS, SIG_LENS, [1, 4], [1, 4]]
+    param_names = ['fmt', 'sig_len', 'n_sig', 'samps_per_frame']
+    unit = 'samples'
+
+    def setup(self, fmt, sig_len, n_sig, samps_per_frame):
+        self.record_name = synthetic.record(fmt, sig_len, n_sig,
+                                            samps_per_frame)
+        self.n_items = sig_len * (samps_per_frame + n_sig - 1)
+
+    def time_rdrecord(self, fmt, sig_len, n_sig, samps_per_frame):
+        wfdb.rdrecord(self.record_name)
+
+    def time_rdrecord_digital(self, fmt, sig_len, n_sig, samps_per_frame):
+        wfdb.rdrecord(self.record_name, physical=False)
+
+
+class RdRecordFrames(object):
+    """
+    Read the frames of multi-frequency records without smoothing them.
+    """
+    params = [synthetic.DAT_FMTS, SIG_LENS, [1, 4]]
+    param_names = ['fmt', 'sig_len', 'n_sig']
+    unit = 'samples'
+
+    def setup(self, fmt, sig_len, n_sig):
+        self.record_name = synthetic.record(fmt, sig_len, n_sig, 4)
+        self.n_items = sig_len * (n_sig + 3)
+
+    def time_rdrecord_frames(self, fmt, sig_len, n_sig):
+        wfdb.rdrecord(self.record_name, smooth_frames=False)
+
+
+class RdHeader(object):
+    params = [[1, 16, 256]]
+    param_names = ['n_sig']
+    unit = 'signals'
+
+    def setup(self, n_sig):
+        self.record_name = synthetic.record('16', 360, n_sig)
+        self.n_items = n_sig
+
+    def time_rdheader(self, n_sig):
+        wfdb.rdheader(self.record_name)
+
+
+class WrSamp(object):
+    """
+    Write records in the formats supported by wrsamp.
+    """
+    params = [synthetic.WRITE_FMTS, SIG_LENS, [1, 4], [1, 4]]
+    param_names = ['fmt', 'sig_len', 'n_sig', 'samps_per_frame']
+    unit = 'samples'
+
+    def setup(self, fmt, sig_len, n_sig, samps_per_frame):
+        self.record = synthetic.make_record(fmt, sig_len, n_sig,
+                                            samps_per_frame)
+        self.write_dir = tempfile.mkdtemp()
+        self.n_items = sig_len * (samps_per_frame + n_sig - 1)
+
+    def teardown(self, fmt, sig_len, n_sig, samps_per_frame):
+        shutil.rmtree(self.write_dir)
+
+    def time_wrsamp(self, fmt, sig_len, n_sig, samps_per_frame):
+        self.record.wrsamp(expanded=True, write_dir=self.write_dir)
+
+
+class Annotations(object):
+    params = [[10000, 100000]]
+    param_names = ['n_ann']
+    unit = 'annotations'
+
+    def setup(self, n_ann):
+        self.record_name = synthetic.annotation(n_ann)
+        self.sample, self.symbol, self.aux_note = synthetic.annotation_fields(
+            n_ann)
+        self.write_dir = tempfile.mkdtemp()
+        self.n_items = n_ann
+
+    def teardown(self, n_ann):
+        shutil.rmtree(self.write_dir)
+
+    def time_rdann(self, n_ann):
+        wfdb.rdann(self.record_name, 'atr')
+
+    def time_wrann(self, n_ann):
+        wfdb.wrann('ann', 'atr', self.sample, symbol=self.symbol,
+                   aux_note=self.aux_note, write_dir=self.write_dir)
@@ -0,0 +1,130 @@
+"""
+Benchmarks for the qrs detectors, peak finding, resampling and
+annotation comparison.
+
+Run with the benchmark runner, from the base directory of the
+repository:
+
+    python -m benchmarks.run --filter bench_processing
+
+"""
+import os
+
+import numpy as np
+
+import wfdb
+from wfdb import processing
+
+from benchmarks import synthetic
+
+
+# The mitdb record in the repository's sample data
+RECORD_100 = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          os.pardir, 'sample-data', '100')
+
+
+class Detectors(object):
+    """
+    Detect qrs complexes in the first 5 minutes, or all 30 minutes, of
+    record 100.
+    """
+    params = [[108000, 650000]]
+    param_names = ['sig_len']
+    unit = 'samples'
+
+    def setup(self, sig_len):
+        sig, fields = wfdb.rdsamp(RECORD_100, channels=[0], sampto=sig_len)
+        self.sig = sig[:, 0]
+        self.fs = fields['fs']
+        self.n_items = sig_len
+
+    def time_xqrs_detect(self, sig_len):
+        processing.xqrs_detect(self.sig, self.fs, verbose=False)
+
+    def time_gqrs_detect(self, sig_len):
+        processing.gqrs_detect(self.sig, self.fs)
+
+
+class XqrsBeats(object):
+    """
+    Run the xqrs detector on record 100, measured in beats detected per
+    second, for the full detection and for the main detection loop
+    after learning the initial parameters.
+    """
+    params = [[0]]
+    param_names = ['channel']
+    unit = 'beats'
+
+    def setup(self, channel):
+        sig, fields = wfdb.rdsamp(RECORD_100, channels=[channel])
+        self.sig = sig[:, 0]
+        self.fs = fields['fs']
+        self.xqrs = processing.XQRS(sig=self.sig, fs=self.fs)
+        self.xqrs.detect(verbose=False)
+        self.n_items = len(self.xqrs.qrs_inds)
+
+    def time_detect(self, channel):
+        processing.XQRS(sig=self.sig, fs=self.fs).detect(verbose=False)
+
+    def time_detection_loop(self, channel):
+        self.xqrs._learn_init_params()
+        self.xqrs._run_detection()
+
+
+class FindLocalPeaks(object):
+    """
+    Find the local peaks of record 100 and of a random signal of the
+    same length.
+    """
+    params = [['record', 'random'], [18]]
+    param_names = ['signal', 'radius']
+    unit = 'samples'
+
+    def setup(self, signal, radius):
+        sig = wfdb.rdsamp(RECORD_100, channels=[0])[0][:, 0]
+        if signal == 'random':
+            sig = np.random.RandomState(0).randn(len(sig))
+        self.sig = sig
+        self.n_items = len(sig)
+
+    def time_find_local_peaks(self, signal, radius):
+        processing.find_local_peaks(self.sig, radius=radius)
+
+
+class ResampleSig(object):
+    params = [[36000, 1296000], [250, 500], ['fft', 'poly']]
+    param_names = ['sig_len', 'fs_target', 'method']
+    unit = 'samples'
+
+    def setup(self, sig_len, fs_target, method):
+        self.sig = synthetic.make_signal(sig_len, 16) / 200.
+        self.n_items = sig_len
+
+    def time_resample_sig(self, sig_len, fs_target, method):
+        if method == 'fft':
+            processing.resample_sig(self.sig, 360, fs_target)
+        else:
+            processing.resample_sig(self.sig, 360, fs_target, method=method)
+
+
+class CompareAnnotations(object):
+    """
+    Compare beat annotations against a test set with jittered, missing
+    and extra beats.
+    """
+    params = [[10000, 100000]]
+    param_names = ['n_beats']
+    unit = 'beats'
+
+    def setup(self, n_beats):
+        rng = np.random.RandomState(0)
+        self.ref_sample = synthetic.annotation_fields(n_beats)[0]
+        test_sample = self.ref_sample + rng.randint(-20, 21, n_beats)
+        test_sample = test_sample[rng.rand(n_beats) > 0.02]
+        extra = rng.randint(0, self.ref_sample[-1], n_beats // 50)
+        self.test_sample = np.unique(np.concatenate([test_sample, extra]))
+        self.n_items = n_beats
+
+    def time_compare_annotations(self, n_beats):
+        processing.compare_annotations(self.ref_sample, self.test_sample,
+                                       window_width=36)
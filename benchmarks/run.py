@@ -0,0 +1,253 @@
+"""
+Run the benchmark suite, or compare it between two git revisions.
+
+Run from the base directory of the repository:
+
+    python -m benchmarks.run
+    python -m benchmarks.run --filter rdrecord --quick
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --compare HEAD~1 HEAD
+
+The benchmarks are written in the style of asv. Each class of the
+benchmark modules lists its parameter values in `params`, and is set up
+for each combination of them with `setup`. Its `time_*` methods are
+timed, taking the best of `repeat` runs, and run once more under
+tracemalloc to measure their peak memory. The throughput is the
+`n_items` set by `setup`, in the class's `unit`, per second.
+
+To compare revisions, the `wfdb` package of each revision is exported
+with `git archive`, and the current benchmarks are run against it in a
+separate process. Everything runs offline, on synthetic records or on
+the sample data.
+
+"""
+import argparse
+import importlib
+import itertools
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+
+BENCHMARK_MODULES = ['benchmarks.bench_io', 'benchmarks.bench_processing']
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def get_benchmarks(pattern=None, quick=False):
+    """
+    Get the benchmarks to run, as a list of (name, class, method names,
+    params) tuples, for each parameter combination of each class.
+
+    Parameters
+    ----------
+    pattern : str, optional
+        Only keep the benchmarks whose full name, such as
+        'bench_io.RdRecord.time_rdrecord(fmt=16, sig_len=36000)',
+        matches this regular expression.
+    quick : bool, optional
+        Only use the first value of each parameter other than the first.
+
+    """
+    benchmarks = []
+    for module_name in BENCHMARK_MODULES:
+        module = importlib.import_module(module_name)
+        classes = [cls for cls in vars(module).values()
+                   if isinstance(cls, type) and cls.__module__ == module_name]
+
+        for cls in classes:
+            methods = sorted(m for m in dir(cls) if m.startswith('time_'))
+            params = list(getattr(cls, 'params', []))
+            if quick:
+                params = params[:1] + [p[:1] for p in params[1:]]
+
+            for param in itertools.product(*params):
+                names = [benchmark_name(module_name, cls, method, param)
+                         for method in methods]
+                selected = [method for method, name in zip(methods, names)
+                            if pattern is None or re.search(pattern, name)]
+                if selected:
+                    benchmarks.append((cls, selected, param))
+
+    return benchmarks
+
+
+def benchmark_name(module_name, cls, method, param):
+    """
+    Get the full name of a benchmark method with a parameter
+    combination.
+    """
+    param_names = getattr(cls, 'param_names', [])
+    param_str = ', '.join('%s=%s' % (name, value)
+                          for name, value in zip(param_names, param))
+    return '%s.%s.%s(%s)' % (module_name.split('.')[-1], cls.__name__,
+                             method, param_str)
+
+
+def run_benchmarks(pattern=None, repeat=3, quick=False, verbose=True):
+    """
+    Run the benchmarks, and return a list of result dictionaries.
+
+    Each result has the benchmark's name, and either the best `time` in
+    seconds, the `throughput` in `unit` per second and the
+    `peak_memory` in bytes, or the `error` raised by the benchmark. A
+    `setup` raising NotImplementedError skips the parameter
+    combination, as in asv.
+
+    """
+    results = []
+    for cls, methods, param in get_benchmarks(pattern, quick):
+        bench = cls()
+        try:
+            bench.setup(*param)
+        except NotImplementedError:
+            continue
+
+        for method in methods:
+            name = benchmark_name(cls.__module__, cls, method, param)
+            func = getattr(bench, method)
+            try:
+                times = []
+                for _ in range(repeat):
+                    t0 = time.perf_counter()
+                    func(*param)
+                    times.append(time.perf_counter() - t0)
+
+                tracemalloc.start()
+                try:
+                    func(*param)
+                    peak_memory = tracemalloc.get_traced_memory()[1]
+                finally:
+                    tracemalloc.stop()
+
+                result = {'name': name, 'time': min(times),
+                          'throughput': bench.n_items / min(times),
+                          'unit': cls.unit, 'peak_memory': peak_memory}
+            except Exception as e:
+                result = {'name': name, 'error': repr(e)}
+
+            if verbose:
+                print(format_result(result))
+            results.append(result)
+
+        if hasattr(bench, 'teardown'):
+            bench.teardown(*param)
+
+    return results
+
+
+def format_result(result):
+    """
+    Format a benchmark result as a line of text.
+    """
+    if 'error' in result:
+        return '%s: error %s' % (result['name'], result['error'])
+    return '%s: %s, %.3g %s/s, %.1f MB' % (
+        result['name'], format_time(result['time']), result['throughput'],
+        result['unit'], result['peak_memory'] / 2 ** 20)
+
+
+def format_time(seconds):
+    if seconds < 1e-3:
+        return '%.1f us' % (seconds * 1e6)
+    elif seconds < 1:
+        return '%.2f ms' % (seconds * 1e3)
+    return '%.3f s' % seconds
+
+
+def run_revision(rev, args):
+    """
+    Run the benchmarks against the wfdb package of a git revision, in a
+    separate process, and return the results.
+    """
+    work_dir = tempfile.mkdtemp(prefix='wfdb-benchmarks-')
+    try:
+        archive = subprocess.run(['git', 'archive', rev, 'wfdb'],
+                                 cwd=BASE_DIR, stdout=subprocess.PIPE,
+                                 check=True).stdout
+        subprocess.run(['tar', '-x', '-C', work_dir], input=archive,
+                       check=True)
+
+        output = os.path.join(work_dir, 'results.json')
+        command = [sys.executable, '-m', 'benchmarks.run',
+                   '--wfdb-path', work_dir, '--output', output,
+                   '--repeat', str(args.repeat)]
+        if args.filter:
+            command += ['--filter', args.filter]
+        if args.quick:
+            command.append('--quick')
+
+        print('Running the benchmarks on %s' % rev)
+        subprocess.run(command, cwd=BASE_DIR, check=True)
+        with open(output) as f:
+            return json.load(f)
+    finally:
+        shutil.rmtree(work_dir)
+
+
+def compare_results(results_a, results_b, rev_a, rev_b):
+    """
+    Print the time and peak memory ratios of revision b to revision a,
+    for the benchmarks run on both.
+    """
+    results_a = dict((r['name'], r) for r in results_a)
+    print('\nRatios of %s to %s (time, peak memory):' % (rev_b, rev_a))
+    for result_b in results_b:
+        name = result_b['name']
+        result_a = results_a.get(name)
+        if result_a is None:
+            continue
+        if 'error' in result_a or 'error' in result_b:
+            print('%s: error on %s' % (name, rev_a if 'error' in result_a
+                                       else rev_b))
+            continue
+        print('%s: %s -> %s (%.2fx), %.1f -> %.1f MB' % (
+            name, format_time(result_a['time']),
+            format_time(result_b['time']),
+            result_b['time'] / result_a['time'],
+            result_a['peak_memory'] / 2 ** 20,
+            result_b['peak_memory'] / 2 ** 20))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the wfdb benchmarks.')
+    parser.add_argument('--filter', default=None,
+                        help='only run the benchmarks matching this regex')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='number of timed runs of each benchmark')
+    parser.add_argument('--quick', action='store_true',
+                        help='only use the first value of most parameters')
+    parser.add_argument('--output', default=None,
+                        help='json file in which to write the results')
+    parser.add_argument('--compare', nargs=2, metavar=('REV_A', 'REV_B'),
+                        help='compare the benchmarks of two git revisions')
+    parser.add_argument('--wfdb-path', default=None,
+                        help='directory from which to import wfdb')
+    args = parser.parse_args()
+
+    if args.compare:
+        rev_a, rev_b = args.compare
+        results_a = run_revision(rev_a, args)
+        results_b = run_revision(rev_b, args)
+        compare_results(results_a, results_b, rev_a, rev_b)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump({rev_a: results_a, rev_b: results_b}, f, indent=1)
+        return
+
+    if args.wfdb_path:
+        sys.path.insert(0, args.wfdb_path)
+    results = run_benchmarks(args.filter, args.repeat, args.quick)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""
+Synthetic WFDB records and annotations used by the benchmarks.
+
+The files are written once per process into a temporary directory,
+which is removed on exit, so that the benchmarks run offline.
+
+"""
+import atexit
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+import wfdb
+
+
+# All the WFDB dat formats. wrsamp writes WRITE_FMTS, and the other
+# formats are encoded here.
+DAT_FMTS = ['8', '16', '24', '32', '61', '80', '160', '212', '310', '311']
+WRITE_FMTS = ['80', '212', '16', '24', '32']
+
+BIT_RES = {'8': 8, '16': 16, '24': 24, '32': 32, '61': 16, '80': 8,
+           '160': 16, '212': 12, '310': 10, '311': 10}
+
+_data_dir = None
+
+
+def data_dir():
+    """
+    Get the temporary directory holding the synthetic files.
+    """
+    global _data_dir
+    if _data_dir is None:
+        _data_dir = tempfile.mkdtemp(prefix='wfdb-benchmarks-')
+        atexit.register(shutil.rmtree, _data_dir, True)
+    return _data_dir
+
+
+def make_signal(n_samp, bit_res, seed=0):
+    """
+    Make a digital ecg-like signal: a train of narrow beats every 0.8
+    seconds at 360Hz, with baseline wander and noise, spanning about
+    half the range of the resolution.
+    """
+    rng = np.random.RandomState(seed)
+    t = np.arange(n_samp)
+    beats = np.exp(-0.5 * (((t + seed * 37) % 288 - 144) / 4.) ** 2)
+    sig = (beats + 0.1 * np.sin(2 * np.pi * t / 1000.)
+           + 0.02 * rng.randn(n_samp))
+    scale = 2 ** (bit_res - 2)
+    return np.clip(np.round(sig * scale), 1 - 2 ** (bit_res - 1),
+                   2 ** (bit_res - 1) - 1).astype('int64')
+
+
+def encode_samples(samples, fmt):
+    """
+    Encode a stream of interleaved digital samples into the bytes of a
+    dat file of a format which wrsamp does not write.
+    """
+    if fmt == '8':
+        return samples.astype('<i1').tobytes()
+    elif fmt == '61':
+        return samples.astype('>i2').tobytes()
+    elif fmt == '160':
+        return (samples + 32768).astype('<u2').tobytes()
+
+    # Three 10 bit samples are packed into four bytes
+    n_samp = len(samples)
+    samples = np.append(samples, np.zeros(-n_samp % 3, dtype='int64'))
+    samples = (samples & 0x3ff).reshape(-1, 3)
+    s0, s1, s2 = samples[:, 0], samples[:, 1], samples[:, 2]
+    data = np.zeros((len(samples), 4), dtype='int64')
+    if fmt == '310':
+        data[:, 0] = (s0 & 0x7f) << 1
+        data[:, 1] = (s0 >> 7) | ((s2 & 0x1f) << 3)
+        data[:, 2] = (s1 & 0x7f) << 1
+        data[:, 3] = (s1 >> 7) | ((s2 >> 5) << 3)
+    elif fmt == '311':
+        data[:, 0] = s0 & 0xff
+        data[:, 1] = (s0 >> 8) | ((s1 & 0x3f) << 2)
+        data[:, 2] = (s1 >> 6) | ((s2 & 0x0f) << 4)
+        data[:, 3] = s2 >> 4
+    else:
+        raise ValueError('Unknown dat format: %s' % fmt)
+    return data.astype('uint8').tobytes()
+
+
+def make_record(fmt, sig_len, n_sig, samps_per_frame=1, record_name='rec'):
+    """
+    Make a synthetic record holding the expanded digital signals. Its
+    first channel has `samps_per_frame` samples per frame, and the
+    others have one. The signals are stored in a single dat file of
+    format `fmt`.
+    """
+    spf = [samps_per_frame] + (n_sig - 1) * [1]
+    e_d_signal = [make_signal(sig_len * spf[ch], BIT_RES[fmt], seed=ch)
+                  for ch in range(n_sig)]
+    rec = wfdb.Record(record_name=record_name, n_sig=n_sig, fs=360,
+                      sig_len=sig_len, file_name=n_sig * [record_name + '.dat'],
+                      fmt=n_sig * [fmt], samps_per_frame=spf,
+                      adc_gain=n_sig * [200.], baseline=n_sig * [0],
+                      adc_res=n_sig * [BIT_RES[fmt]], adc_zero=n_sig * [0],
+                      units=n_sig * ['mV'],
+                      sig_name=['ch%d' % ch for ch in range(n_sig)],
+                      e_d_signal=e_d_signal)
+    rec.init_value = [int(sig[0]) for sig in e_d_signal]
+    rec.checksum = rec.calc_checksum(expanded=True)
+    rec.block_size = n_sig * [0]
+    return rec
+
+
+def record(fmt, sig_len, n_sig, samps_per_frame=1):
+    """
+    Get the path of the synthetic record made by `make_record`, writing
+    it if needed.
+    """
+    record_name = 'rec_%s_%d_%d_%d' % (fmt, sig_len, n_sig, samps_per_frame)
+    path = os.path.join(data_dir(), record_name)
+    if os.path.isfile(path + '.hea'):
+        return path
+
+    rec = make_record(fmt, sig_len, n_sig, samps_per_frame, record_name)
+
+    if fmt in WRITE_FMTS:
+        rec.wrsamp(expanded=True, write_dir=data_dir())
+    else:
+        rec.wrheader(write_dir=data_dir())
+        # The samples of each frame are stored one channel after another
+        samples = np.concatenate(
+            [rec.e_d_signal[ch].reshape(sig_len, rec.samps_per_frame[ch])
+             for ch in range(n_sig)], axis=1).ravel()
+        with open(path + '.dat', 'wb') as f:
+            f.write(encode_samples(samples, fmt))
+
+    return path
+
+
+def annotation(n_ann, fs=360, extension='atr'):
+    """
+    Get the record path of a synthetic annotation file with n_ann beat
+    annotations about every 0.8 seconds, writing it if needed. Every
+    tenth beat is a 'V', and every hundredth has an aux note.
+    """
+    record_name = 'ann_%d' % n_ann
+    path = os.path.join(data_dir(), record_name)
+    if os.path.isfile('%s.%s' % (path, extension)):
+        return path
+
+    sample, symbol, aux_note = annotation_fields(n_ann, fs)
+    wfdb.wrann(record_name, extension, sample, symbol=symbol,
+               aux_note=aux_note, write_dir=data_dir())
+    return path
+
+
+def annotation_fields(n_ann, fs=360, seed=0):
+    """
+    Make the sample, symbol and aux_note fields of n_ann beat
+    annotations, as written by `annotation`.
+    """
+    rng = np.random.RandomState(seed)
+    sample = np.cumsum(rng.randint(int(0.6 * fs), int(fs), n_ann))
+    symbol = np.array(n_ann * ['N'], dtype=object)
+    symbol[::10] = 'V'
+    aux_note = np.array(n_ann * [''], dtype=object)
+    aux_note[::100] = '(N'
+    return sample, list(symbol), list(aux_note)
@@ -183,3 +183,92 @@ class test_annotation():
         assert (comp == [True] * 6)
         assert annotation.__eq__(pbannotation)
         assert annotation.__eq__(writeannotation)
+
+    def test_4(self):
+        """
+        Compact annotation storage. The compact annotation must expand
+        back to the standard annotation, and be written identically.
+        """
+        annotation = wfdb.rdann('sample-data/12726', 'anI')
+        compact_annotation = wfdb.rdann('sample-data/12726', 'anI',
+                                        compact=True)
+
+        symbol = compact_annotation.get_label_attribute('symbol')
+        dtypes = [compact_annotation.sample.dtype,
+                  compact_annotation.label_store.dtype,
+                  compact_annotation.subtype.dtype,
+                  compact_annotation.chan.dtype,
+                  compact_annotation.num.dtype]
+
+        # Test file writing
+        compact_annotation.wrann(write_fs=True)
+        writeannotation = wfdb.rdann('12726', 'anI')
+        writeannotation.create_label_map()
+
+        compact_annotation.expand()
+        annotation.create_label_map()
+
+        assert dtypes == [np.dtype(t) for t in ['i8', 'u1', 'i1', 'u1', 'i1']]
+        assert list(symbol) == annotation.symbol
+        assert isinstance(writeannotation.aux_note, list)
+        assert annotation.__eq__(compact_annotation)
+        assert annotation.__eq__(writeannotation)
+
+    def test_5(self):
+        """
+        Indexed reading of sample ranges. Decoding from the annotation
+        file index must give the same annotations as decoding from the
+        start of the file.
+        """
+        ranges = [(1, None), (100000, 300000), (649000, None), (649990, 650000)]
+
+        comp = []
+        for sampfrom, sampto in ranges:
+            annotation = wfdb.rdann('sample-data/100', 'atr',
+                                    sampfrom=sampfrom, sampto=sampto)
+            indexed_annotation = wfdb.rdann('sample-data/100', 'atr',
+                                            sampfrom=sampfrom, sampto=sampto,
+                                            use_index=True)
+            comp.append(annotation.__eq__(indexed_annotation))
+            comp.append(annotation.sample.min() >= sampfrom)
+
+        assert comp == [True] * 2 * len(ranges)
+
+    def test_6(self):
+        """
+        Incremental reading of annotation batches. The batches must
+        combine into the annotation read by rdann.
+        """
+        annotation = wfdb.rdann('sample-data/1003', 'atr', compact=True)
+        batches = list(wfdb.iter_ann('sample-data/1003', 'atr', chunk=100,
+                                     block_size=1024))
+
+        comp = [np.array_equal(np.concatenate([getattr(b, field) for b in batches]),
+                               getattr(annotation, field))
+                for field in ['sample', 'label_store', 'subtype', 'chan', 'num']]
+
+        aux_note = {}
+        for i, b in enumerate(batches):
+            aux_note.update({100 * i + j: note for j, note in b.aux_note.items()})
+
+        assert comp == [True] * 5
+        assert [b.ann_len for b in batches] == [100] * 9 + [57]
+        assert aux_note == annotation.aux_note
+        assert batches[-1].fs == annotation.fs
+        assert batches[-1].custom_labels == annotation.custom_labels
+
+    def test_7(self):
+        """
+        Parallel reading of the annotation files of many records.
+        """
+        annotations = wfdb.rdann_many(['sample-data/100', 'sample-data/1003'],
+                                      ['atr'], workers=2)
+        annotations_100 = wfdb.rdann_many(['sample-data/100'], ['atr', 'qrs'],
+                                          workers=1)
+
+        comp = [annotations['sample-data/100']['atr'].__eq__(wfdb.rdann('sample-data/100', 'atr')),
+                annotations['sample-data/1003']['atr'].__eq__(wfdb.rdann('sample-data/1003', 'atr')),
+                annotations_100['sample-data/100']['qrs'].__eq__(wfdb.rdann('sample-data/100', 'qrs'))]
+
+        assert comp == [True] * 3
+        assert list(annotations_100['sample-data/100']) == ['atr', 'qrs']
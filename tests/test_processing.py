@@ -1,3 +1,5 @@
+import os
+
 import numpy as np
 
 import wfdb
@@ -36,6 +38,54 @@ class test_processing():
         assert new_sig.shape[0] == expected_length
         assert new_sig.shape[1] == sig.shape[1]
 
+    def test_resample_poly(self):
+        sig, fields = wfdb.rdsamp('sample-data/100')
+        ann = wfdb.rdann('sample-data/100', 'atr')
+
+        fs = fields['fs']
+        fs_target = 250
+
+        new_sig, step = processing.resample_sig(sig, fs, fs_target,
+                                                method='poly')
+        assert new_sig.shape == (int(sig.shape[0] * fs_target / fs), 2)
+        assert step == fs / fs_target
+
+        # Chunks give the same result
+        new_sig_chunks, _ = processing.resample_sig(sig, fs, fs_target,
+                                                    method='poly',
+                                                    chunk_size=10000)
+        assert np.array_equal(new_sig_chunks, new_sig)
+
+        # The annotations are moved as with the fft method
+        new_sig, new_ann = processing.resample_multichan(sig, ann, fs,
+                                                         fs_target,
+                                                         method='poly')
+        _, fft_ann = processing.resample_multichan(sig, ann, fs, fs_target)
+        assert np.abs(new_ann.sample - fft_ann.sample).max() <= 1
+        assert np.array_equal(
+            new_ann.sample,
+            processing.resample_ann(np.arange(new_sig.shape[0]) * step,
+                                    ann.sample))
+
+    def test_resample_ann(self):
+        resampled_t = np.arange(4) * 1.44
+
+        # Nearest locations, with halfway annotations moving later, and
+        # annotations past the end moving to the last location
+        new_sample = processing.resample_ann(resampled_t,
+                                             np.array([0, 0.72, 1, 2, 2, 5, 10]))
+        assert np.array_equal(new_sample, [0, 1, 1, 1, 1, 3, 3])
+        assert new_sample.dtype == 'int64'
+
+        # Locations are returned in order
+        new_sample = processing.resample_ann(resampled_t, np.array([5, 0]))
+        assert np.array_equal(new_sample, [0, 3])
+
+        # More duplicates than an int16 count can hold
+        new_sample = processing.resample_ann(resampled_t,
+                                             np.full(40000, 2, dtype='int64'))
+        assert np.array_equal(new_sample, np.ones(40000))
+
     def test_normalize_bound(self):
         sig, _ = wfdb.rdsamp('sample-data/100')
         lb = -5
@@ -76,6 +126,40 @@ class test_processing():
 
         assert np.array_equal(peaks, expected_peaks)
 
+    def test_gqrs_feed(self):
+        """
+        Feed record 100 to gqrs in uneven chunks, and compare to the
+        batch detection
+        """
+        record = wfdb.rdrecord('sample-data/100', channels=[0],
+                               sampto=100000, physical=False)
+        d_sig = record.d_signal[:,0]
+        adc_gain = record.adc_gain[0]
+        adc_zero = record.adc_zero[0]
+
+        expected_peaks = processing.gqrs_detect(d_sig=d_sig, fs=record.fs,
+                                                adc_gain=adc_gain,
+                                                adc_zero=adc_zero)
+
+        gqrs = processing.qrs.GQRS()
+        gqrs.start(processing.qrs.GQRS.Conf(fs=record.fs, adc_gain=adc_gain),
+                   adc_zero)
+        peaks = []
+        for start, stop in [(0, 100), (100, 331), (331, 50000),
+                            (50000, 50001), (50001, 100000)]:
+            peaks.extend(gqrs.feed(d_sig[start:stop]))
+        peaks.extend(gqrs.finish())
+
+        assert np.array_equal(peaks, expected_peaks)
+        assert gqrs.SIG_SMOOTH is None and gqrs.SIG_QRS is None
+
+        gqrs = processing.qrs.GQRS()
+        gqrs.detect(d_sig, processing.qrs.GQRS.Conf(fs=record.fs,
+                                                    adc_gain=adc_gain),
+                    adc_zero, debug=True)
+        assert gqrs.SIG_QRS.shape == (len(d_sig) - 3 * gqrs.c.dt + 2
+                                      + gqrs.c.dt4,)
+
     def test_correct_peaks(self):
         sig, fields = wfdb.rdsamp('sample-data/100')
         ann = wfdb.rdann('sample-data/100', 'atr')
@@ -100,6 +184,169 @@ class test_processing():
 
         assert np.array_equal(yz, expected_peaks)
 
+    def test_shift_peaks(self):
+        """
+        Shift peaks to the local maxima and minima within their windows,
+        which exclude the last sample of the signal
+        """
+        sig = np.array([0, 3, 1, 0, 0, 2, 5, 1, 0, 0, 1, 0, 4, 0, 6.])
+        peak_inds = np.array([6, 9, 13])
+
+        assert np.array_equal(processing.peaks.shift_peaks(
+            sig, peak_inds, search_radius=3, peak_up=True), [6, 6, 12])
+        assert np.array_equal(processing.peaks.shift_peaks(
+            sig, peak_inds, search_radius=3, peak_up=False), [3, 8, 11])
+
+    def test_find_peaks_plateaus(self):
+        """
+        Find the hard and soft peaks of a signal with plateaus
+        """
+        sig = np.array([0, 1, 1, 1, 0, 2, 2, 0, -1, -1, -1, 0, 3, 0, 1, 2, 2,
+                        3, 1, 1])
+        hard_peaks, soft_peaks = processing.find_peaks(sig)
+
+        assert np.array_equal(hard_peaks, [4, 12, 13, 17])
+        assert np.array_equal(soft_peaks, [2, 5, 9])
+
+    def test_find_local_peaks(self):
+        """
+        Compare find_local_peaks to a direct scan of the signal, on
+        random signals with plateaus
+        """
+        def scan_local_peaks(sig, radius):
+            peak_inds = []
+            i = 0
+            while i < len(sig):
+                if sig[i] == max(sig[max(i - radius, 0):i + radius]):
+                    peak_inds.append(i)
+                    i += radius
+                else:
+                    i += 1
+            return np.array(peak_inds)
+
+        np.random.seed(0)
+        for sig_len in [10, 100, 1000]:
+            for radius in [1, 2, 5, 9]:
+                # Integer, plateau, and continuous signals
+                sigs = [np.random.randint(0, 4, sig_len),
+                        np.repeat(np.random.randn(sig_len), 3)[:sig_len],
+                        np.random.randn(sig_len).cumsum()]
+                for sig in sigs:
+                    assert np.array_equal(
+                        processing.find_local_peaks(sig, radius),
+                        scan_local_peaks(sig, radius))
+
+        assert processing.find_local_peaks(np.ones(10), 2).size == 0
+
+    def test_compute_hr(self):
+        """
+        Compare compute_hr to filling the heart rate of each rr interval
+        in turn, with sparse, dense, and repeated qrs indices
+        """
+        def fill_hr(sig_len, qrs_inds, fs):
+            heart_rate = np.full(sig_len, np.nan, dtype='float32')
+            for i in range(0, len(qrs_inds) - 2):
+                rr = (qrs_inds[i+1] - qrs_inds[i]) * (1.0 / fs) * 1000
+                heart_rate[qrs_inds[i+1]+1:qrs_inds[i+2]+1] = 60000.0 / rr
+            if len(qrs_inds) > 1:
+                heart_rate[qrs_inds[-1]:] = heart_rate[qrs_inds[-1]]
+            return heart_rate
+
+        np.random.seed(0)
+        for sig_len, n_qrs in [(10000, 30), (1000, 300), (100, 1), (100, 2)]:
+            qrs_inds = np.sort(np.random.randint(0, sig_len, n_qrs))
+            if n_qrs > 7:
+                qrs_inds[5:7] = qrs_inds[7]
+            expected_hr = fill_hr(sig_len, qrs_inds, 360)
+            for downsample in [1, 7, 360]:
+                heart_rate = processing.compute_hr(sig_len, qrs_inds, 360,
+                                                   downsample=downsample)
+                assert heart_rate.dtype == np.float32
+                assert np.array_equal(heart_rate, expected_hr[::downsample],
+                                      equal_nan=True)
+
+    def test_compare_annotations(self):
+        """
+        Compare the matches of compare_annotations to scanning the test
+        samples for each reference sample, on the documented scenarios
+        and random sets of annotations
+        """
+        def closest_scan(ref_samp, test_sample, start):
+            closest = start
+            smallest_diff = abs(ref_samp - test_sample[start])
+            for i in range(start, len(test_sample)):
+                if abs(ref_samp - test_sample[i]) < smallest_diff:
+                    closest = i
+                    smallest_diff = abs(ref_samp - test_sample[i])
+                if ref_samp <= test_sample[i]:
+                    break
+            return closest, smallest_diff
+
+        def match_scan(ref_sample, test_sample, window_width):
+            matching = np.full(len(ref_sample), -1)
+            start = 0
+            for i in range(len(ref_sample)):
+                if start >= len(test_sample):
+                    break
+                closest, diff = closest_scan(ref_sample[i], test_sample, start)
+                if i < len(ref_sample) - 1:
+                    closest_next, diff_next = closest_scan(ref_sample[i+1],
+                                                           test_sample, start)
+                else:
+                    closest_next = -1
+                if closest == closest_next and diff_next < diff:
+                    if closest and (not i or closest - 1 != matching[i-1]):
+                        closest -= 1
+                        if abs(ref_sample[i] - test_sample[closest]) < window_width:
+                            matching[i] = closest
+                        start = closest + 1
+                else:
+                    if diff < window_width:
+                        matching[i] = closest
+                    start = closest + 1
+            return matching
+
+        # Scenarios A to D of Comparitor.compare
+        samples = [([0, 5, 9, 13], [0, 8, 13]),
+                   ([0, 5, 11, 15], [0, 9, 12, 15]),
+                   ([0, 7, 13, 17], [0, 2, 11, 14, 17]),
+                   ([0, 7, 13, 17], [0, 2, 11, 17])]
+        np.random.seed(0)
+        for i in range(300):
+            ref_sample = np.sort(np.random.randint(0, 500, 40))
+            test_sample = ref_sample + np.random.randint(-8, 9, 40)
+            test_sample = np.sort(np.concatenate([
+                test_sample[np.random.rand(40) > 0.1],
+                np.random.randint(0, 500, i % 5)]))
+            samples.append((ref_sample, test_sample))
+
+        for ref_sample, test_sample in samples:
+            ref_sample = np.array(ref_sample)
+            test_sample = np.array(test_sample)
+            for window_width in [3, 10]:
+                comparitor = processing.compare_annotations(
+                    ref_sample, test_sample, window_width)
+                assert np.array_equal(
+                    comparitor.matching_sample_nums,
+                    match_scan(ref_sample, test_sample, window_width))
+
+    def test_benchmark_mitdb_local(self):
+        """
+        Benchmark xqrs on a record of a local directory, in the calling
+        process
+        """
+        comparitors, specificity, _, _ = processing.benchmark_mitdb(
+            processing.xqrs_detect, db_dir='sample-data', records=['100'],
+            workers=1)
+        comparitor = comparitors['100']
+
+        assert specificity > 0.99
+        assert comparitor.n_samples == 650000
+        assert comparitor.wall_time >= comparitor.detector_time > 0
+        assert comparitor.samples_per_second > 0
+        assert comparitor.peak_memory > 0
+
+
 class test_qrs():
     """
     Testing qrs detectors
@@ -121,3 +368,91 @@ class test_qrs():
         assert comparitor.specificity > 0.99
         assert comparitor.positive_predictivity > 0.99
         assert comparitor.false_positive_rate < 0.01
+
+    def test_xqrs_inds(self):
+        """
+        Run xqrs detector on a segment of record 100 and compare to the
+        expected qrs indices
+        """
+        sig, fields = wfdb.rdsamp('sample-data/100', channels=[0],
+                                  sampto=10000)
+
+        expected_peaks = [76, 370, 662, 946, 1231, 1515, 1809, 2044, 2402,
+                          2705, 2997, 3282, 3559, 3862, 4170, 4465, 4764,
+                          5060, 5346, 5633, 5918, 6214, 6526, 6823, 7105,
+                          7391, 7669, 7953, 8245, 8539, 8837, 9141, 9431,
+                          9710]
+
+        qrs_inds = processing.xqrs_detect(sig=sig[:,0], fs=fields['fs'],
+                                          verbose=False)
+
+        assert np.array_equal(qrs_inds, expected_peaks)
+
+    def test_streaming_xqrs(self):
+        """
+        Run the streaming xqrs detector on record 100 in one second
+        chunks, and compare to the batch detector
+        """
+        sig, fields = wfdb.rdsamp('sample-data/100', channels=[0],
+                                  sampto=36000)
+        fs = fields['fs']
+
+        xqrs = processing.XQRS(sig=sig[:,0], fs=fs)
+        xqrs.detect(verbose=False)
+
+        stream_xqrs = processing.StreamingXQRS(fs=fs)
+        qrs_inds = []
+        for i in range(0, len(sig), fs):
+            qrs_inds.extend(stream_xqrs.add_chunk(sig[i:i + fs, 0]))
+        qrs_inds.extend(stream_xqrs.finish())
+
+        assert qrs_inds == stream_xqrs.qrs_inds
+
+        comparitor = processing.compare_annotations(xqrs.qrs_inds,
+                                                    np.array(qrs_inds),
+                                                    int(0.05 * fs))
+
+        assert comparitor.specificity > 0.99
+        assert comparitor.positive_predictivity == 1
+
+    def test_detect_many(self):
+        """
+        Run xqrs detection over the ecg channels of a record, in worker
+        processes and in the calling process, and compare to running the
+        detector on each channel
+        """
+        record = wfdb.rdrecord('sample-data/100_3chan')
+        expected_samples = []
+        expected_chans = []
+        for ch in range(3):
+            qrs_inds = processing.xqrs_detect(sig=record.p_signal[:,ch],
+                                              fs=record.fs, verbose=False)
+            expected_samples.extend(qrs_inds)
+            expected_chans.extend(len(qrs_inds) * [ch])
+        order = np.lexsort((expected_chans, expected_samples))
+
+        for workers in [2, 1]:
+            annotations, timings = processing.detect_many(
+                ['sample-data/100_3chan'], channels='ecg', workers=workers)
+            annotation = annotations['sample-data/100_3chan']
+
+            assert annotation.record_name == '100_3chan'
+            assert np.array_equal(annotation.sample,
+                                  np.array(expected_samples)[order])
+            assert np.array_equal(annotation.chan,
+                                  np.array(expected_chans)[order])
+            assert timings['sample-data/100_3chan'] > 0
+
+        # No channels of the class. No annotation file is written.
+        annotations, _ = processing.detect_many(
+            ['sample-data/100_3chan'], channels='resp', workers=1,
+            write_dir='.')
+        assert len(annotations['sample-data/100_3chan'].sample) == 0
+        assert not os.path.isfile('100_3chan.qrs')
+
+    def test_get_class_channels(self):
+        sig_name = ['MLII', 'ECG1', 'CO2', 'co', 'STAT', 'ECGx']
+        assert processing.qrs.get_class_channels(sig_name, 'ecg') == [0, 1]
+        assert processing.qrs.get_class_channels(sig_name, 'co') == [3]
+        assert processing.qrs.get_class_channels(sig_name, 'co2') == [2]
+        assert processing.qrs.get_class_channels(sig_name, 'st') == []
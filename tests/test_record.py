@@ -1,5 +1,6 @@
 import os
 import shutil
+import struct
 
 import numpy as np
 
@@ -579,6 +580,126 @@ class TestSignal():
         assert record_2.__eq__(record)
 
 
+class TestProfiler():
+    """
+    Test the profiler callbacks of the read stages
+    """
+    def test_profile_collector(self):
+        collector = wfdb.ProfileCollector()
+        with collector:
+            assert wfdb.get_profiler() is collector
+            record = wfdb.rdrecord('sample-data/100')
+            wfdb.rdrecord('sample-data/310derive', physical=False)
+        assert wfdb.get_profiler() is None
+
+        stats = collector.stats
+        assert set(stats) == set(['rdheader', '_rd_dat_file',
+                                  '_blocks_to_samples', '_skew_sig', 'dac',
+                                  'convert_dtype'])
+        assert stats['rdheader'][0] == 2
+        assert stats['dac'][0] == 1
+        # The 100.dat file holds 650000 frames of two 212 samples
+        assert stats['_rd_dat_file'][2] >= 650000 * 3
+        assert stats['dac'][2] == record.p_signal.nbytes
+        assert all(s[1] >= 0 for s in stats.values())
+        assert 'convert_dtype' in collector.report()
+
+        # Disabled profiling does not call the collector
+        collector.reset()
+        wfdb.rdrecord('sample-data/100', sampto=1000)
+        assert collector.stats == {}
+
+    def test_set_profiler(self):
+        calls = []
+        previous = wfdb.set_profiler(lambda *args: calls.append(args))
+        try:
+            wfdb.rdheader('sample-data/100')
+        finally:
+            wfdb.set_profiler(previous)
+
+        assert len(calls) == 1
+        stage, seconds, n_bytes = calls[0]
+        assert stage == 'rdheader'
+        assert n_bytes > 0
+
+
+class TestTff():
+    """
+    Test reading tff files, written with two int16 signals
+    """
+    @staticmethod
+    def write_tff(file_name, signal_bytes, sensors=(80, 81), bit_width=16):
+        header = b''
+        # fs, sensor types, sample format, start time, end of tags
+        for tag, data in [(1003, struct.pack('>H', 1000)),
+                          (1007, bytes(sensors)),
+                          (3, struct.pack('B', 128 | bit_width)),
+                          (101, struct.pack('>I', 1500000000)),
+                          (2, b'')]:
+            header += (struct.pack('>HH', tag, len(data)) + data
+                       + b'\0' * (-len(data) % 4))
+        with open(file_name, 'wb') as f:
+            f.write(header + signal_bytes)
+
+    def test_rdtff(self):
+        frames = np.arange(20, dtype='>i2').reshape(10, 2)
+        # Not an escape sequence, as it is not at the start of a frame
+        frames[4, 1] = -32768
+        marker = b'\x80\x00\x01\x03abc\x00'
+        trigger = b'\x80\x00\x02\x00'
+        signal_bytes = (frames[:2].tobytes() + marker + frames[2:5].tobytes()
+                        + trigger + frames[5:].tobytes())
+
+        self.write_tff('test.tff', signal_bytes)
+        signal, fields, markers, triggers = wfdb.io.rdtff('test.tff')
+        assert np.array_equal(signal, frames)
+        assert np.array_equal(markers, [2])
+        assert np.array_equal(triggers, [5])
+        assert fields['fs'] == 1000
+        assert fields['sig_name'] == ['ecg_0', 'ecg_1']
+
+        # A trailing incomplete frame
+        self.write_tff('test.tff', signal_bytes + frames[0, :1].tobytes())
+        signal, _, markers, triggers = wfdb.io.rdtff('test.tff', cut_end=True)
+        assert np.array_equal(signal, frames)
+        assert np.array_equal(markers, [2])
+        assert np.array_equal(triggers, [5])
+
+    def test_iter_tff(self):
+        frames = np.arange(20, dtype='>i2').reshape(10, 2)
+        marker = b'\x80\x00\x01\x00'
+        trigger = b'\x80\x00\x02\x00'
+        # A marker after the last frame goes in the last block
+        signal_bytes = (frames[:2].tobytes() + marker + frames[2:5].tobytes()
+                        + trigger + frames[5:].tobytes() + marker)
+
+        self.write_tff('test.tff', signal_bytes)
+        blocks = list(wfdb.io.iter_tff('test.tff', chunk=4))
+        assert [len(block[0]) for block in blocks] == [4, 4, 2]
+        assert np.array_equal(np.concatenate([block[0] for block in blocks]),
+                              frames)
+        assert [list(block[2]) for block in blocks] == [[2], [], [10]]
+        assert [list(block[3]) for block in blocks] == [[], [5], []]
+        assert blocks[0][1]['fs'] == 1000
+
+        # One 8-bit channel, with an escape tag split between the bytes
+        # of the first and second blocks
+        frames = np.arange(1, 11, dtype='i1').reshape(10, 1)
+        signal_bytes = (frames[:4].tobytes() + marker + frames[4:].tobytes())
+        self.write_tff('test.tff', signal_bytes, sensors=(80,), bit_width=8)
+        signal, _, markers, _ = wfdb.io.rdtff('test.tff')
+        blocks = list(wfdb.io.iter_tff('test.tff', chunk=4))
+        assert np.array_equal(signal, frames)
+        assert np.array_equal(np.concatenate([block[0] for block in blocks]),
+                              frames)
+        assert [list(block[2]) for block in blocks] == [[], [4], []]
+
+    @classmethod
+    def tearDownClass(cls):
+        if os.path.isfile('test.tff'):
+            os.remove('test.tff')
+
+
 class TestDownload():
     # Test that we can download records with no "dat" file
     # Regression test for https://github.com/MIT-LCP/wfdb-python/issues/118
@@ -1,8 +1,9 @@
 from .io.record import (Record, MultiRecord, rdheader, rdrecord, rdsamp,
                         wrsamp, dl_database)
-from .io.annotation import (Annotation, rdann, wrann, show_ann_labels,
-                            show_ann_classes)
+from .io.annotation import (Annotation, rdann, rdann_many, iter_ann, wrann,
+                            show_ann_labels, show_ann_classes)
 from .io.download import get_dbs, get_record_list, dl_files, set_db_index_url
+from .io.profiler import set_profiler, get_profiler, ProfileCollector
 from .plot.plot import plot_items, plot_wfdb, plot_all_records
 
 from .version import __version__
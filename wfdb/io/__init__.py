@@ -1,7 +1,8 @@
 from .record import (Record, MultiRecord, rdheader, rdrecord, rdsamp, wrsamp,
                      dl_database, SIGNAL_CLASSES)
 from ._signal import est_res, wr_dat_file
-from .annotation import (Annotation, rdann, wrann, show_ann_labels,
-                         show_ann_classes)
+from .annotation import (Annotation, rdann, rdann_many, iter_ann, wrann,
+                         show_ann_labels, show_ann_classes)
 from .download import get_dbs, get_record_list, dl_files, set_db_index_url
-from .tff import rdtff
+from .profiler import set_profiler, get_profiler, ProfileCollector
+from .tff import rdtff, iter_tff
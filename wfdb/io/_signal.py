@@ -4,6 +4,7 @@ import os
 import numpy as np
 
 from . import download
+from . import profiler
 import pdb
 
 
@@ -457,6 +458,7 @@ class SignalMixin(object):
 
         """
 
+        t0 = profiler._start()
         # The digital nan values for each channel
         d_nans = _digi_nan(self.fmt)
 
@@ -491,6 +493,10 @@ class SignalMixin(object):
                 self.p_signal = self.d_signal
                 self.d_signal = None
 
+            if t0 is not None:
+                profiler._stop('dac', t0, profiler._nbytes(
+                    self.e_p_signal if expanded else self.p_signal))
+
         # Return the variable
         else:
             if expanded:
@@ -510,6 +516,9 @@ class SignalMixin(object):
                 np.divide(p_signal, self.adc_gain, p_signal)
                 p_signal[nanlocs] = np.nan
 
+            if t0 is not None:
+                profiler._stop('dac', t0, profiler._nbytes(p_signal))
+
             return p_signal
 
 
@@ -623,6 +632,7 @@ class SignalMixin(object):
 
 
     def convert_dtype(self, physical, return_res, smooth_frames):
+        t0 = profiler._start()
         if physical is True:
             returndtype = 'float'+str(return_res)
             if smooth_frames is True:
@@ -650,6 +660,13 @@ class SignalMixin(object):
                         if int(str(currentdtype)[3:])>int(str(returndtype)[3:]):
                             raise Exception('Cannot convert digital samples to lower dtype. Risk of overflow/underflow.')
                         self.e_d_signal[ch] = self.e_d_signal[ch].astype(returndtype, copy=False)
+
+        if t0 is not None:
+            if physical is True:
+                sig = self.p_signal if smooth_frames is True else self.e_p_signal
+            else:
+                sig = self.d_signal if smooth_frames is True else self.e_d_signal
+            profiler._stop('convert_dtype', t0, profiler._nbytes(sig))
         return
 
     def calc_checksum(self, expanded=False):
@@ -1206,6 +1223,7 @@ def _rd_dat_file(file_name, dir_name, pb_dir, fmt, start_byte, n_samp):
 
     """
 
+    t0 = profiler._start()
     # element_count is the number of elements to read using np.fromfile
     # for local files
     # byte_count is the number of bytes to read for streaming files
@@ -1231,6 +1249,9 @@ def _rd_dat_file(file_name, dir_name, pb_dir, fmt, start_byte, n_samp):
                                         start_byte,
                                         np.dtype(DATA_LOAD_TYPES[fmt]))
 
+    if t0 is not None:
+        profiler._stop('_rd_dat_file', t0, sig_data.nbytes)
+
     return sig_data
 
 
@@ -1251,6 +1272,9 @@ def _blocks_to_samples(sig_data, n_samp, fmt):
         The numpy array of digital samples
 
     """
+    t0 = profiler._start()
+    n_bytes = len(sig_data)
+
     if fmt == '212':
         # Easier to process when dealing with whole blocks
         if n_samp % 2:
@@ -1337,6 +1361,10 @@ def _blocks_to_samples(sig_data, n_samp, fmt):
         # Loaded values as un_signed. Convert to 2's complement form.
         # Values > 2^9-1 are negative.
         sig[sig > 511] -= 1024
+
+    if t0 is not None:
+        profiler._stop('_blocks_to_samples', t0, n_bytes)
+
     return sig
 
 
@@ -1360,6 +1388,8 @@ def _skew_sig(sig, skew, n_sig, read_len, fmt, nan_replace, samps_per_frame=None
     `samps_per_frame` is only used for skewing expanded signals.
 
     """
+    t0 = profiler._start()
+
     if max(skew)>0:
 
         # Expanded frame samples. List of arrays.
@@ -1391,6 +1421,9 @@ def _skew_sig(sig, skew, n_sig, read_len, fmt, nan_replace, samps_per_frame=None
                 if nan_replace[ch]>0:
                     sig[-nan_replace[ch]:, ch] = _digi_nan(fmt)
 
+    if t0 is not None:
+        profiler._stop('_skew_sig', t0, profiler._nbytes(sig))
+
     return sig
 
 
@@ -1,4 +1,4 @@
-import copy
+import multiprocessing
 import numpy as np
 import os
 import pandas as pd
@@ -24,6 +24,13 @@ class Annotation(object):
     text used to label annotations that are not one of these codes should go in
     the 'aux_note' field rather than the 'sym' field.
 
+    For long annotation sets, call `compact()` (or read with
+    `rdann(..., compact=True)`) to store the fields as small integer arrays.
+    In compact form, the labels are only stored as `label_store` codes into
+    the label table, and `aux_note` is a dictionary mapping annotation
+    indices to their non-empty notes. Use `get_label_attribute` to obtain
+    the symbols or descriptions on demand, and `expand()` to convert back.
+
     Examples
     --------
     >>> ann1 = wfdb.Annotation(record_name='rec1', extension='atr',
@@ -146,7 +153,12 @@ class Annotation(object):
         for field in ['sample', 'label_store', 'subtype', 'chan', 'num']:
             setattr(self, field, getattr(self, field)[kept_inds])
 
-        self.aux_note = [self.aux_note[i] for i in kept_inds]
+        if isinstance(self.aux_note, dict):
+            self.aux_note = {new_i: self.aux_note[i]
+                             for new_i, i in enumerate(kept_inds)
+                             if i in self.aux_note}
+        else:
+            self.aux_note = [self.aux_note[i] for i in kept_inds]
 
         self.ann_len = len(self.sample)
 
@@ -306,7 +318,11 @@ class Annotation(object):
 
         # The string fields
         elif field in ['symbol', 'description', 'aux_note']:
-            uniq_elements = set(item)
+            # Compact aux_note fields map indices to notes
+            if isinstance(item, dict):
+                uniq_elements = set(item.values())
+            else:
+                uniq_elements = set(item)
 
             for e in uniq_elements:
                 if not isinstance(e, str_types):
@@ -368,7 +384,10 @@ class Annotation(object):
 
         for field in ['sample', 'num', 'subtype', 'chan', 'aux_note']+present_label_fields:
             if getattr(self, field) is not None:
-                if len(getattr(self, field)) != nannots:
+                if isinstance(getattr(self, field), dict):
+                    if set(getattr(self, field)) - set(range(nannots)):
+                        raise ValueError("The indices of the '"+field+"' field must be within the range of the 'sample' field")
+                elif len(getattr(self, field)) != nannots:
                     raise ValueError("The lengths of the 'sample' and '"+field+"' fields do not match")
 
         # Ensure all label fields are defined by the label map. This has to be checked because
@@ -675,84 +694,229 @@ class Annotation(object):
 
     def calc_core_bytes(self):
         """
-        Convert all used annotation fields into bytes to write
+        Convert all used annotation fields into bytes to write.
+
+        The byte stream is assembled with vectorized numpy operations.
+        Each annotation is encoded as a SKIP element (if its sample
+        difference exceeds 1023), its sample and label pair, and any
+        of its num, subtype, chan, and aux_note fields which need to be
+        written, in that order.
         """
         # The difference sample to write
-        if len(self.sample) == 1:
-            sampdiff = np.array([self.sample[0]])
+        sample = np.asarray(self.sample, dtype='int64')
+        sampdiff = np.concatenate(([sample[0]], np.diff(sample)))
+
+        # The numerical values encoding the annotation labels
+        label_store = self.get_label_store_codes()
+
+        # Compact the optional fields so that the output file is as
+        # small as possible. Each mask indicates which annotations need
+        # to have the field written.
+        write_masks = compact_field_masks(len(sample), self.num,
+                                          self.subtype, self.chan,
+                                          self.aux_note)
+
+        # Number of bytes taken by each annotation element
+        is_skip = sampdiff > 1023
+        core_len = np.where(is_skip, 8, 2)
+        num_len = 2 * write_masks['num']
+        subtype_len = 2 * write_masks['subtype']
+        chan_len = 2 * write_masks['chan']
+        if write_masks['aux_note'].any():
+            aux_note = [self.aux_note[i] for i in np.where(write_masks['aux_note'])[0]]
+            aux_note_lens = np.array([len(a) for a in aux_note], dtype='int64')
+        else:
+            aux_note = []
+            aux_note_lens = np.zeros(0, dtype='int64')
+        aux_len = np.zeros(len(sample), dtype='int64')
+        # Zero pad odd length aux_note strings
+        aux_len[write_masks['aux_note']] = 2 + aux_note_lens + (aux_note_lens & 1)
+
+        ann_len = core_len + num_len + subtype_len + chan_len + aux_len
+        ann_start = np.cumsum(ann_len) - ann_len
+
+        data_bytes = np.zeros(int(ann_len.sum()), dtype='u1')
+
+        # Just need samp and sym:
+        # - First byte stores low 8 bits of samp
+        # - Second byte stores high 2 bits of samp and sym
+        inds = ann_start[~is_skip]
+        sd = sampdiff[~is_skip]
+        data_bytes[inds] = sd & 255
+        data_bytes[inds + 1] = ((sd & 768) >> 8) + 4 * label_store[~is_skip]
+
+        # Add SKIP element if value is too large for single byte.
+        # 8 bytes in total:
+        # - [0, 59>>2] indicates SKIP
+        # - Next 4 gives sample difference
+        # - Final 2 give 0 and sym
+        inds = ann_start[is_skip]
+        sd = sampdiff[is_skip]
+        data_bytes[inds + 1] = 236
+        data_bytes[inds + 2] = (sd & 16711680) >> 16
+        data_bytes[inds + 3] = (sd & 4278190080) >> 24
+        data_bytes[inds + 4] = sd & 255
+        data_bytes[inds + 5] = (sd & 65280) >> 8
+        data_bytes[inds + 7] = 4 * label_store[is_skip]
+
+        # The extra fields. First byte stores the value, second byte
+        # stores the field indicator: num 60*4, subtype 61*4, chan 62*4.
+        field_start = ann_start + core_len
+        for field, indicator, field_len in [('num', 240, num_len),
+                                            ('subtype', 244, subtype_len),
+                                            ('chan', 248, chan_len)]:
+            mask = write_masks[field]
+            if mask.any():
+                inds = field_start[mask]
+                data_bytes[inds] = np.asarray(getattr(self, field))[mask]
+                data_bytes[inds + 1] = indicator
+            field_start = field_start + field_len
+
+        # aux_note:
+        # - First byte stores length of aux_note field
+        # - Second byte stores 63*4 indicator
+        # - Then store the aux_note string characters
+        if len(aux_note):
+            inds = field_start[write_masks['aux_note']]
+            data_bytes[inds] = aux_note_lens
+            data_bytes[inds + 1] = 252
+            chars = np.frombuffer(''.join(aux_note).encode('utf-32-le'),
+                                  dtype='<u4')
+            char_start = np.cumsum(aux_note_lens) - aux_note_lens
+            char_inds = (np.repeat(inds + 2 - char_start, aux_note_lens)
+                         + np.arange(len(chars)))
+            data_bytes[char_inds] = chars
+
+        return data_bytes
+
+    def get_label_store_codes(self):
+        """
+        Get the label_store values of each annotation, as a numpy array.
+        The symbol field is mapped through the label map if present,
+        otherwise the label_store field is used directly, falling back
+        to mapping the description field.
+        """
+        if self.symbol is not None:
+            source_field = 'symbol'
+        elif self.label_store is not None:
+            return np.asarray(self.label_store, dtype='int64')
+        elif self.description is not None:
+            source_field = 'description'
         else:
-            sampdiff = np.concatenate(([self.sample[0]], np.diff(self.sample)))
+            raise Exception('No annotation labels contained in object')
 
-        # Create a copy of the annotation object with a
-        # compact version of fields to write
-        compact_annotation = copy.deepcopy(self)
-        compact_annotation.compact_fields()
+        label_map = self.create_label_map(inplace=False)
+        to_store = dict(zip(label_map[source_field].values,
+                            label_map['label_store'].values))
+        return np.array([to_store[s] for s in getattr(self, source_field)],
+                        dtype='int64')
 
+    def get_label_attribute(self, attribute):
+        """
+        Get the values of a label attribute (label_store, symbol, or
+        description) for every annotation, computed from whichever label
+        attribute is stored in the object.
 
-        # The optional fields to be written. Write if they are not None or all empty
-        extra_write_fields = []
+        The values are looked up by `label_store` code in a table built
+        from the label map, so this is how the symbols and descriptions
+        of compact annotations are obtained on demand.
 
-        for field in ['num', 'subtype', 'chan', 'aux_note']:
-            if not isblank(getattr(compact_annotation, field)):
-                extra_write_fields.append(field)
+        Parameters
+        ----------
+        attribute : str
+            The label attribute to get. One of: 'label_store', 'symbol',
+            'description'.
 
-        data_bytes = []
+        Returns
+        -------
+        values : numpy array
+            The values of the label attribute for each annotation.
 
-        # Iterate across all fields one index at a time
-        for i in range(len(sampdiff)):
+        """
+        if attribute not in ann_label_fields:
+            raise ValueError('Invalid attribute specified')
 
-            # Process the samp (difference) and sym items
-            data_bytes.append(field2bytes('samptype', [sampdiff[i], self.symbol[i]]))
+        label_store = self.get_label_store_codes()
 
-            # Process the extra optional fields
-            for field in extra_write_fields:
-                value = getattr(compact_annotation, field)[i]
-                if value is not None:
-                    data_bytes.append(field2bytes(field, value))
+        if attribute == 'label_store':
+            return label_store
 
-        # Flatten and convert to correct format
-        data_bytes = np.array([item for sublist in data_bytes for item in sublist]).astype('u1')
+        label_map = self.create_label_map(inplace=False)
+        # Label store values are encoded in 6 bits
+        label_table = np.empty(64, dtype='object')
+        label_table[label_map['label_store'].values] = label_map[attribute].values
 
-        return data_bytes
+        return label_table[label_store]
 
-    # Compact all of the object's fields so that the output
-    # writing annotation file writes as few bytes as possible
-    def compact_fields(self):
+    def compact(self):
+        """
+        Convert the annotation fields into compact columnar storage,
+        in place.
+
+        - `sample` is stored as an int64 array.
+        - The labels are stored only as `label_store` codes in a uint8
+          array. The `symbol` and `description` fields are unset. Call
+          `get_label_attribute` to view them.
+        - `subtype` and `num` are stored as int8 arrays, and `chan` as
+          a uint8 array, matching the WFDB file storage.
+        - `aux_note` is stored as a dictionary mapping the indices of
+          annotations with non-empty notes to their notes.
 
-        # Number of annotations
-        nannots = len(self.sample)
+        """
+        self.label_store = self.get_label_store_codes().astype('u1')
+        self.symbol = None
+        self.description = None
 
-        # Chan and num carry over previous fields. Get lists of as few
-        # elements to write as possible
-        self.chan = compact_carry_field(self.chan)
-        self.num = compact_carry_field(self.num)
-
-        # Elements of 0 (default) do not need to be written for subtype.
-        # num and sub are signed in original c package...
-        if self.subtype is not None:
-            if isinstance(self.subtype, list):
-                for i in range(nannots):
-                    if self.subtype[i] == 0:
-                        self.subtype[i] = None
-                if np.array_equal(self.subtype, [None]*nannots):
-                    self.subtype = None
+        self.sample = np.asarray(self.sample, dtype='int64')
+
+        for field, dtype in [('subtype', 'i1'), ('chan', 'u1'), ('num', 'i1')]:
+            if getattr(self, field) is not None:
+                setattr(self, field, np.asarray(getattr(self, field)).astype(dtype))
+
+        if self.aux_note is not None and not isinstance(self.aux_note, dict):
+            self.aux_note = {i: note for i, note in enumerate(self.aux_note)
+                             if note}
+
+        return
+
+    def expand(self, return_label_elements=['symbol']):
+        """
+        Convert a compact annotation back into its standard storage, in
+        place. The inverse of `compact`.
+
+        Parameters
+        ----------
+        return_label_elements : list, optional
+            The label elements to set. A list with at least one of the
+            following options: 'symbol', 'label_store', 'description'.
+
+        """
+        if isinstance(return_label_elements, str):
+            return_label_elements = [return_label_elements]
+
+        label_elements = {e: self.get_label_attribute(e)
+                          for e in return_label_elements}
+        for e in ann_label_fields:
+            if e == 'label_store':
+                value = label_elements.get(e)
+            elif e in label_elements:
+                value = list(label_elements[e])
             else:
-                zero_inds = np.where(self.subtype==0)[0]
-                if len(zero_inds) == nannots:
-                    self.subtype = None
-                else:
-                    self.subtype = list(self.subtype)
-                    for i in zero_inds:
-                        self.subtype[i] = None
+                value = None
+            setattr(self, e, value)
 
-        # Empty aux_note strings are not written
-        if self.aux_note is not None:
-            for i in range(nannots):
-                if self.aux_note[i] == '':
-                    self.aux_note[i] = None
-            if np.array_equal(self.aux_note, [None]*nannots):
-                self.aux_note = None
+        self.sample = self.sample.astype('int')
+        for field in ['subtype', 'chan', 'num']:
+            if getattr(self, field) is not None:
+                setattr(self, field, getattr(self, field).astype('int'))
 
+        if isinstance(self.aux_note, dict):
+            aux_note = [''] * len(self.sample)
+            for i in self.aux_note:
+                aux_note[i] = self.aux_note[i]
+            self.aux_note = aux_note
+
+        return
 
     def sym_to_aux(self):
         # Move non-encoded symbol elements into the aux_note field
@@ -958,100 +1122,41 @@ def custom_triplet_bytes(custom_triplet):
     return annbytes
 
 
-# Tests whether the item is blank
-def isblank(x):
-    if x is None:
-        return True
-    elif isinstance(x, list):
-        if set(x) == set([None]):
-            return True
-    return False
-
-
-def compact_carry_field(full_field):
+def compact_field_masks(nannots, num, subtype, chan, aux_note):
     """
-    Return the compact list version of a list/array of an
-    annotation field that has previous values carried over
-    (chan or num)
-    - The first sample is 0 by default. Only set otherwise
-      if necessary.
-    - Only set fields if they are different from their prev
-      field
+    Get boolean masks indicating which annotations need to have each of
+    the optional fields written, so that the output annotation file
+    contains as few bytes as possible.
+
+    - chan and num carry over their previous values, so only changed
+      values are written. The value before the first annotation is 0.
+    - subtype defaults to 0, and zero values are not written.
+    - Empty aux_note strings are not written.
     """
+    masks = {}
 
-    # Keep in mind that the field may already be compact or None
-
-    if full_field is None:
-        return None
-
-    # List of same length. Place None where element
-    # does not need to be written
-    compact_field = [None]*len(full_field)
-
-    prev_field = 0
-
-    for i in range(len(full_field)):
-        current_field = full_field[i]
-        if current_field != prev_field:
-            compact_field[i] = current_field
-            prev_field = current_field
-
-    # May further simplify
-    if np.array_equal(compact_field, [None]*len(full_field)):
-        compact_field = None
-
-    return compact_field
-
-
-# Convert an annotation field into bytes to write
-def field2bytes(field, value):
-
-    data_bytes = []
-
-    # samp and sym bytes come together
-    if field == 'samptype':
-        # Numerical value encoding annotation symbol
-        typecode = ann_label_table.loc[ann_label_table['symbol']==value[1], 'label_store'].values[0]
+    for field, value in [('num', num), ('chan', chan)]:
+        if value is None:
+            masks[field] = np.zeros(nannots, dtype='bool')
+        else:
+            value = np.asarray(value)
+            masks[field] = value != np.concatenate(([0], value[:-1]))
 
-        # sample difference
-        sd = value[0]
+    if subtype is None:
+        masks['subtype'] = np.zeros(nannots, dtype='bool')
+    else:
+        masks['subtype'] = np.asarray(subtype) != 0
 
-        # Add SKIP element if value is too large for single byte
-        if sd>1023:
-            # 8 bytes in total:
-            # - [0, 59>>2] indicates SKIP
-            # - Next 4 gives sample difference
-            # - Final 2 give 0 and sym
-            data_bytes = [0, 236, (sd&16711680)>>16, (sd&4278190080)>>24, sd&255, (sd&65280)>>8, 0, 4*typecode]
-        # Just need samp and sym
-        else:
-            # - First byte stores low 8 bits of samp
-            # - Second byte stores high 2 bits of samp
-            #   and sym
-            data_bytes = [sd & 255, ((sd & 768) >> 8) + 4*typecode]
-
-    elif field == 'num':
-        # First byte stores num
-        # second byte stores 60*4 indicator
-        data_bytes = [value, 240]
-    elif field == 'subtype':
-        # First byte stores subtype
-        # second byte stores 61*4 indicator
-        data_bytes = [value, 244]
-    elif field == 'chan':
-        # First byte stores num
-        # second byte stores 62*4 indicator
-        data_bytes = [value, 248]
-    elif field == 'aux_note':
-        # - First byte stores length of aux_note field
-        # - Second byte stores 63*4 indicator
-        # - Then store the aux_note string characters
-        data_bytes = [len(value), 252] + [ord(i) for i in value]
-        # Zero pad odd length aux_note strings
-        if len(value) % 2:
-            data_bytes.append(0)
+    if aux_note is None:
+        masks['aux_note'] = np.zeros(nannots, dtype='bool')
+    elif isinstance(aux_note, dict):
+        masks['aux_note'] = np.zeros(nannots, dtype='bool')
+        masks['aux_note'][[i for i in aux_note if aux_note[i]]] = True
+    else:
+        masks['aux_note'] = np.array([a is not None and a != ''
+                                      for a in aux_note], dtype='bool')
 
-    return data_bytes
+    return masks
 
 
 def wrann(record_name, extension, sample, symbol=None, subtype=None, chan=None,
@@ -1195,7 +1300,7 @@ def show_ann_classes():
 # todo: return as df option?
 def rdann(record_name, extension, sampfrom=0, sampto=None, shift_samps=False,
           pb_dir=None, return_label_elements=['symbol'],
-          summarize_labels=False):
+          summarize_labels=False, compact=False, use_index=False):
     """
     Read a WFDB annotation file record_name.extension and return an
     Annotation object.
@@ -1229,6 +1334,16 @@ def rdann(record_name, extension, sampfrom=0, sampto=None, shift_samps=False,
         contained in the file to the 'contained_labels' attribute of the
         returned object. This table will contain the columns:
         ['label_store', 'symbol', 'description', 'n_occurrences']
+    compact : bool, optional
+        If True, return the annotation in compact columnar storage. See
+        `Annotation.compact` for details. The labels are only returned as
+        `label_store` values, and `return_label_elements` is ignored.
+    use_index : bool, optional
+        If True, use an index of checkpoints into the annotation file to
+        start decoding near `sampfrom`, rather than from the beginning of
+        the file. The index is built on the first indexed read of a file,
+        and cached in memory for subsequent reads of the same file. This
+        speeds up repeated windowed reads of long annotation files.
 
     Returns
     -------
@@ -1253,23 +1368,50 @@ def rdann(record_name, extension, sampfrom=0, sampto=None, shift_samps=False,
     return_label_elements = check_read_inputs(sampfrom, sampto,
                                               return_label_elements)
 
+    return _rdann(record_name, extension, sampfrom, sampto, shift_samps,
+                  pb_dir, return_label_elements, summarize_labels, compact,
+                  use_index)
+
+
+def _rdann(record_name, extension, sampfrom, sampto, shift_samps, pb_dir,
+           return_label_elements, summarize_labels, compact, use_index,
+           header_cache=None):
+    """
+    Read a WFDB annotation file, with inputs already checked. See `rdann`
+    for the parameters. `header_cache` is passed to `get_ann_fs`.
+    """
     # Read the file in byte pairs
     filebytes = load_byte_pairs(record_name, extension, pb_dir)
 
     # Get wfdb annotation fields from the file bytes
-    (sample, label_store, subtype,
-     chan, num, aux_note) = proc_ann_bytes(filebytes, sampto)
-
-    # Get the indices of annotations that hold definition information about
-    # the entire annotation file, and other empty annotations to be removed.
-    potential_definition_inds, rm_inds = get_special_inds(sample, label_store,
+    if use_index and sampfrom > 0:
+        # Start decoding from the last checkpoint before sampfrom. The
+        # file definitions are taken from the index.
+        ann_index = get_ann_index(record_name, extension, pb_dir, filebytes)
+        checkpoint = ann_index.find_checkpoint(sampfrom)
+        (sample, label_store, subtype,
+         chan, num, aux_note) = proc_ann_bytes(filebytes, sampto,
+                                               *ann_index.get_state(checkpoint))
+        potential_definition_inds, rm_inds = get_special_inds(sample,
+                                                              label_store,
+                                                              aux_note)
+        fs, custom_labels = ann_index.fs, ann_index.custom_labels
+    else:
+        (sample, label_store, subtype,
+         chan, num, aux_note) = proc_ann_bytes(filebytes, sampto)
+
+        # Get the indices of annotations that hold definition information
+        # about the entire annotation file, and other empty annotations to
+        # be removed.
+        potential_definition_inds, rm_inds = get_special_inds(sample,
+                                                              label_store,
+                                                              aux_note)
+
+        # Try to extract information describing the annotation file
+        (fs,
+         custom_labels) = interpret_defintion_annotations(potential_definition_inds,
                                                           aux_note)
 
-    # Try to extract information describing the annotation file
-    (fs,
-     custom_labels) = interpret_defintion_annotations(potential_definition_inds,
-                                                      aux_note)
-
     # Remove annotations that do not store actual sample and label information
     (sample, label_store, subtype,
      chan, num, aux_note) = rm_empty_indices(rm_inds, sample, label_store,
@@ -1281,12 +1423,7 @@ def rdann(record_name, extension, sampfrom=0, sampto=None, shift_samps=False,
 
     # Try to get fs from the header file if it is not contained in the
     # annotation file
-    if fs is None:
-        try:
-            rec = record.rdheader(record_name, pb_dir)
-            fs = rec.fs
-        except:
-            pass
+    fs = get_ann_fs(record_name, pb_dir, fs, header_cache)
 
     # Create the annotation object
     annotation = Annotation(record_name=os.path.split(record_name)[1],
@@ -1295,8 +1432,9 @@ def rdann(record_name, extension, sampfrom=0, sampto=None, shift_samps=False,
                             chan=chan, num=num, aux_note=aux_note, fs=fs,
                             custom_labels=custom_labels)
 
-    # Apply the desired index range
-    if sampfrom > 0 and sampto is not None:
+    # Apply the desired index range. Annotations after sampto have
+    # already been excluded while decoding.
+    if sampfrom > 0 and annotation.ann_len > 0:
         annotation.apply_range(sampfrom=sampfrom, sampto=sampto)
 
     # If specified, obtain annotation samples relative to the starting
@@ -1310,7 +1448,265 @@ def rdann(record_name, extension, sampfrom=0, sampto=None, shift_samps=False,
         annotation.get_contained_labels(inplace=True)
 
     # Set/unset the desired label values
-    annotation.set_label_elements(return_label_elements)
+    if compact:
+        annotation.compact()
+    else:
+        annotation.set_label_elements(return_label_elements)
+
+    return annotation
+
+
+def rdann_many(record_names, extensions, workers=None, pb_dir=None,
+               sampfrom=0, sampto=None, return_label_elements=['symbol'],
+               compact=False):
+    """
+    Read the WFDB annotation files of many records and annotators, in
+    parallel.
+
+    The annotation files of each record are read together in one worker
+    process, sharing a single read of the record's header file for
+    annotation files that do not contain their sampling frequency.
+
+    Parameters
+    ----------
+    record_names : list
+        The record names of the WFDB annotation files. ie. for file
+        '100.atr', the record name is '100'.
+    extensions : list
+        The annotator extensions of the annotation files to read for
+        every record. ie. ['atr', 'qrs'].
+    workers : int, optional
+        The number of worker processes. Defaults to the number of CPUs.
+        If 1, the files are read in the calling process.
+    pb_dir : str, optional
+        Option used to stream data from Physiobank. See `rdann`.
+    sampfrom : int, optional
+        The minimum sample number for annotations to be returned.
+    sampto : int, optional
+        The maximum sample number for annotations to be returned.
+    return_label_elements : list, optional
+        The label elements that are to be returned from reading the
+        annotation files. See `rdann`.
+    compact : bool, optional
+        If True, return the annotations in compact columnar storage. See
+        `Annotation.compact`.
+
+    Returns
+    -------
+    annotations : dict
+        Nested dictionary of Annotation objects, keyed on the record names
+        and then on the annotator extensions.
+
+    Examples
+    --------
+    >>> anns = wfdb.rdann_many(['100', '101'], ['atr', 'qrs'],
+                               pb_dir='mitdb', workers=4)
+    >>> anns['100']['atr'].sample
+
+    """
+    return_label_elements = check_read_inputs(sampfrom, sampto,
+                                              return_label_elements)
+    if isinstance(extensions, str):
+        extensions = [extensions]
+
+    n_records = len(record_names)
+    # Function arguments for starmap
+    args = zip(record_names, n_records * [extensions], n_records * [pb_dir],
+               n_records * [sampfrom], n_records * [sampto],
+               n_records * [return_label_elements], n_records * [compact])
+
+    if workers == 1:
+        record_annotations = [rdann_record(*a) for a in args]
+    else:
+        with multiprocessing.Pool(workers) as p:
+            record_annotations = p.starmap(rdann_record, args)
+
+    return dict(zip(record_names, record_annotations))
+
+
+def rdann_record(record_name, extensions, pb_dir, sampfrom, sampto,
+                 return_label_elements, compact):
+    """
+    Read the annotation files of a single record, used by `rdann_many`.
+    Returns a dictionary of Annotation objects keyed on the extensions.
+    """
+    header_cache = {}
+    return {extension: _rdann(record_name, extension, sampfrom, sampto,
+                              False, pb_dir, return_label_elements, False,
+                              compact, False, header_cache)
+            for extension in extensions}
+
+
+def iter_ann(record_name, extension, chunk=10000, pb_dir=None,
+             return_label_elements=['symbol'], compact=True,
+             block_size=65536):
+    """
+    Read a WFDB annotation file record_name.extension incrementally,
+    yielding batches of annotations as Annotation objects.
+
+    The file is read and decoded in blocks, so that the memory used is
+    bounded by the batch and block sizes rather than the file size.
+
+    Parameters
+    ----------
+    record_name : str
+        The record name of the WFDB annotation file. ie. for file '100.atr',
+        record_name='100'.
+    extension : str
+        The annotatator extension of the annotation file. ie. for  file
+        '100.atr', extension='atr'.
+    chunk : int, optional
+        The number of annotations in each yielded batch. The last batch
+        may contain fewer annotations.
+    pb_dir : str, optional
+        Option used to stream data from Physiobank. The Physiobank database
+        directory from which to find the required annotation file. eg. For
+        record '100' in 'http://physionet.org/physiobank/database/mitdb':
+        pb_dir='mitdb'.
+    return_label_elements : list, optional
+        The label elements that are to be returned from reading the annotation
+        file. A list with at least one of the following options: 'symbol',
+        'label_store', 'description'. Only used if `compact` is False.
+    compact : bool, optional
+        If True, yield the batches in compact columnar storage, with all
+        fields stored as arrays. See `Annotation.compact` for details.
+    block_size : int, optional
+        The number of bytes of the file to read at a time.
+
+    Yields
+    ------
+    annotation : Annotation
+        An Annotation object with the next batch of annotations. The
+        'fs' and 'custom_labels' definitions from the head of the file are
+        set in every batch.
+
+    Examples
+    --------
+    >>> for ann in wfdb.iter_ann('sample-data/100', 'atr', chunk=500):
+    ...     print(ann.sample[0], ann.ann_len)
+
+    """
+    return_label_elements = check_read_inputs(0, None, return_label_elements)
+
+    if pb_dir is None:
+        blocks = read_file_blocks(record_name + '.' + extension, block_size)
+    else:
+        blocks = download._stream_annotation_blocks(record_name + '.' + extension,
+                                                    pb_dir, block_size)
+
+    # The decoded annotation fields that have not yet been yielded
+    pending = [[], [], [], [], [], []]
+    # The unprocessed file bytes, starting from an annotation
+    buffer = np.zeros(0, dtype='<u1')
+    state = {'bpi': 0, 'sample_total': 0, 'chan_start': 0, 'num_start': 0}
+    # The file definitions are read from the annotations at sample 0 at
+    # the head of the file, before any batch is yielded.
+    definitions = None
+
+    for block in blocks:
+        at_eof = block is None
+        if not at_eof:
+            buffer = np.concatenate((buffer, block))
+        filebytes = buffer[:buffer.shape[0] // 2 * 2].reshape([-1, 2])
+
+        if at_eof:
+            end_bpi = None
+        else:
+            # Only decode annotations which are complete in the buffer
+            end_bpi = filebytes.shape[0] - MAX_ANN_PAIRS
+            if end_bpi <= 0:
+                continue
+
+        state['bpi'] = 0
+        fields = proc_ann_bytes(filebytes, None, end_bpi=end_bpi,
+                                end_state=state, **state)
+        buffer = buffer[2 * state['bpi']:]
+        for pending_field, field in zip(pending, fields):
+            pending_field.extend(field)
+
+        if definitions is None:
+            if pending[0] and (at_eof or max(pending[0]) > 0):
+                # Get the file definitions, and remove the annotations
+                # that do not store actual sample and label information
+                potential_definition_inds, rm_inds = get_special_inds(*pending[:2],
+                                                                      pending[5])
+                definitions = interpret_defintion_annotations(potential_definition_inds,
+                                                              pending[5])
+                pending = [list(p) for p in rm_empty_indices(rm_inds, *pending)]
+                definitions = (get_ann_fs(record_name, pb_dir, definitions[0]),
+                               definitions[1])
+            elif not at_eof:
+                continue
+            else:
+                return
+        else:
+            # Remove the non-annotations
+            rm_inds = set(np.where(np.array(pending[1]) == 0)[0])
+            pending = [list(p) for p in rm_empty_indices(rm_inds, *pending)]
+
+        while len(pending[0]) >= chunk or (at_eof and pending[0]):
+            batch = [p[:chunk] for p in pending]
+            pending = [p[chunk:] for p in pending]
+            yield make_ann_batch(record_name, extension, batch, definitions,
+                                 return_label_elements, compact)
+
+
+def read_file_blocks(file_name, block_size):
+    """
+    Read a local file in blocks of bytes. Yields numpy uint8 arrays,
+    followed by None once the end of the file is reached.
+    """
+    with open(file_name, 'rb') as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            yield np.frombuffer(block, dtype='<u1')
+    yield None
+
+
+def get_ann_fs(record_name, pb_dir, fs, header_cache=None):
+    """
+    Get the sampling frequency of an annotation file. If it was not
+    contained in the annotation file, try to get it from the header file.
+
+    If `header_cache` is a dict, the header file's fs is stored in it
+    under the record name, so that the header is read at most once for
+    annotation files of the same record.
+    """
+    if fs is None:
+        if header_cache is not None and record_name in header_cache:
+            return header_cache[record_name]
+        try:
+            rec = record.rdheader(record_name, pb_dir)
+            fs = rec.fs
+        except:
+            pass
+        if header_cache is not None:
+            header_cache[record_name] = fs
+    return fs
+
+
+def make_ann_batch(record_name, extension, fields, definitions,
+                   return_label_elements, compact):
+    """
+    Create an Annotation object from a batch of decoded annotation
+    field lists, used by `iter_ann`.
+    """
+    sample, label_store, subtype, chan, num, aux_note = fields
+    (sample, label_store, subtype,
+     chan, num) = lists_to_int_arrays(sample, label_store, subtype, chan, num)
+    fs, custom_labels = definitions
+
+    annotation = Annotation(record_name=os.path.split(record_name)[1],
+                            extension=extension, sample=sample,
+                            label_store=label_store, subtype=subtype,
+                            chan=chan, num=num, aux_note=aux_note, fs=fs,
+                            custom_labels=custom_labels)
+    if compact:
+        annotation.compact()
+    else:
+        annotation.set_label_elements(return_label_elements)
 
     return annotation
 
@@ -1342,8 +1738,27 @@ def load_byte_pairs(record_name, extension, pb_dir):
 
     return filebytes
 
-#  Get regular annotation fields from the annotation bytes
-def proc_ann_bytes(filebytes, sampto):
+def proc_ann_bytes(filebytes, sampto, bpi=0, sample_total=0, chan_start=0,
+                   num_start=0, ann_bpi=None, end_bpi=None, end_state=None):
+    """
+    Get regular annotation fields from the annotation bytes.
+
+    Decoding starts from byte pair index `bpi`, which must be the start
+    of an annotation. `sample_total` is the sample number of the
+    annotation before it, and `chan_start` and `num_start` are the chan
+    and num values carried over from it. The defaults start decoding
+    from the beginning of the file.
+
+    Decoding continues until the end of the file bytes, or until an
+    annotation would start at or after byte pair index `end_bpi` if
+    given.
+
+    If `ann_bpi` is a list, the byte pair index at which each decoded
+    annotation starts is appended to it. If `end_state` is a dict, it is
+    updated with the decoder state needed to resume decoding where it
+    stopped: the 'bpi', 'sample_total', 'chan_start', and 'num_start'
+    arguments of this function.
+    """
 
     # Base annotation fields
     sample, label_store, subtype, chan, num, aux_note = [], [], [], [], [], []
@@ -1351,10 +1766,8 @@ def proc_ann_bytes(filebytes, sampto):
     # Indexing Variables
 
     # Total number of sample from beginning of record. Annotation bytes
-    # only store sample_diff
-    sample_total = 0
-    # Byte pair index
-    bpi = 0
+    # only store sample_diff. `sample_total` gives the starting value.
+    # Byte pair index `bpi` gives the starting pair.
 
     # Process annotations. Iterate across byte pairs.
     # Sequence for one ann is:
@@ -1362,7 +1775,13 @@ def proc_ann_bytes(filebytes, sampto):
     # - samp + sym pair
     # - other pairs (if any)
     # The last byte pair of the file is 0 indicating eof.
-    while (bpi < filebytes.shape[0] - 1):
+    if end_bpi is None:
+        end_bpi = filebytes.shape[0] - 1
+
+    while (bpi < end_bpi):
+
+        if ann_bpi is not None:
+            ann_bpi.append(bpi)
 
         # Get the sample and label_store fields of the current annotation
         sample_diff, current_label_store, bpi = proc_core_fields(filebytes, bpi)
@@ -1386,12 +1805,20 @@ def proc_ann_bytes(filebytes, sampto):
             current_label_store = filebytes[bpi, 1] >> 2
 
         # Set defaults or carry over previous values if necessary
-        subtype, chan, num, aux_note = update_extra_fields(subtype, chan, num, aux_note, update)
+        subtype, chan, num, aux_note = update_extra_fields(subtype, chan, num,
+                                                           aux_note, update,
+                                                           chan_start,
+                                                           num_start)
 
         if sampto and sampto<sample_total:
             sample, label_store, subtype, chan, num, aux_note = rm_last(sample, label_store, subtype, chan, num, aux_note)
             break
 
+    if end_state is not None:
+        end_state.update({'bpi': bpi, 'sample_total': sample_total,
+                          'chan_start': chan[-1] if chan else chan_start,
+                          'num_start': num[-1] if num else num_start})
+
     return sample, label_store, subtype, chan, num, aux_note
 
 # Get the sample difference and store fields of the current annotation
@@ -1468,13 +1895,16 @@ def proc_extra_field(label_store, filebytes, bpi, subtype, chan, num, aux_note,
     return subtype, chan, num, aux_note, update, bpi
 
 
-def update_extra_fields(subtype, chan, num, aux_note, update):
+def update_extra_fields(subtype, chan, num, aux_note, update, chan_start=0,
+                        num_start=0):
     """
     Update the field if the current annotation did not
     provide a value.
 
     - aux_note and sub are set to default values if missing.
-    - chan and num copy over previous value if missing.
+    - chan and num copy over previous value if missing. The values
+      carried over to the first annotation are `chan_start` and
+      `num_start`.
     """
 
     if update['subtype']:
@@ -1482,12 +1912,12 @@ def update_extra_fields(subtype, chan, num, aux_note, update):
 
     if update['chan']:
         if chan == []:
-            chan.append(0)
+            chan.append(chan_start)
         else:
             chan.append(chan[-1])
     if update['num']:
         if num == []:
-            num.append(0)
+            num.append(num_start)
         else:
             num.append(num[-1])
 
@@ -1595,6 +2025,114 @@ def rm_last(*args):
         return [a[:-1] for a in args]
     return
 
+# Number of annotations between consecutive checkpoints of an
+# annotation file index
+ANN_INDEX_INTERVAL = 1024
+
+# Upper bound on the number of byte pairs used to store a single
+# annotation and the pair following it, when decoding incrementally: a
+# SKIP, the sample and label pair, num, subtype, chan, and a 255
+# character aux_note take up 137 pairs.
+MAX_ANN_PAIRS = 1024
+
+
+class AnnotationIndex(object):
+    """
+    An index of checkpoints into an annotation file, used to start
+    decoding the file near a desired sample number.
+
+    Each checkpoint stores the byte pair index at which an annotation
+    starts, together with the decoder state carried into it: the sample
+    number and the chan and num values of the previous annotation. The
+    file definitions (fs and custom labels) stored at the head of the
+    file are also kept, as they would otherwise only be obtained by
+    decoding from the beginning.
+
+    Create an index from the file byte pairs with `from_bytes`.
+
+    """
+    def __init__(self, bpi, sample_total, max_sample, chan, num, fs,
+                 custom_labels):
+        self.bpi = bpi
+        self.sample_total = sample_total
+        self.max_sample = max_sample
+        self.chan = chan
+        self.num = num
+        self.fs = fs
+        self.custom_labels = custom_labels
+
+    @classmethod
+    def from_bytes(cls, filebytes, interval=ANN_INDEX_INTERVAL):
+        """
+        Build the index by decoding all of the file byte pairs, placing
+        a checkpoint every `interval` annotations.
+        """
+        ann_bpi = []
+        (sample, label_store, subtype,
+         chan, num, aux_note) = proc_ann_bytes(filebytes, None,
+                                               ann_bpi=ann_bpi)
+
+        potential_definition_inds, _ = get_special_inds(sample, label_store,
+                                                        aux_note)
+        (fs,
+         custom_labels) = interpret_defintion_annotations(potential_definition_inds,
+                                                          aux_note)
+
+        # The state carried into each annotation comes from the previous
+        # one. There is always a checkpoint at the start of the file.
+        checkpoints = np.arange(0, max(len(sample), 1), interval)
+        prev_sample = np.array([0] + sample[:-1], dtype='int64')
+
+        return cls(bpi=np.array(ann_bpi or [0], dtype='int64')[checkpoints],
+                   sample_total=prev_sample[checkpoints],
+                   max_sample=np.maximum.accumulate(prev_sample)[checkpoints],
+                   chan=np.array([0] + chan[:-1], dtype='int')[checkpoints],
+                   num=np.array([0] + num[:-1], dtype='int')[checkpoints],
+                   fs=fs, custom_labels=custom_labels)
+
+    def find_checkpoint(self, sampfrom):
+        """
+        Get the last checkpoint before which every annotation has a
+        sample number smaller than `sampfrom`.
+        """
+        return max(np.searchsorted(self.max_sample, sampfrom) - 1, 0)
+
+    def get_state(self, checkpoint):
+        """
+        Get the decoder state of a checkpoint, as the `bpi`,
+        `sample_total`, `chan_start`, and `num_start` arguments of
+        `proc_ann_bytes`.
+        """
+        return (int(self.bpi[checkpoint]), int(self.sample_total[checkpoint]),
+                int(self.chan[checkpoint]), int(self.num[checkpoint]))
+
+
+# Cached annotation file indexes. Keys are the file locations, and
+# values are tuples of the file identity and the index.
+_ann_index_cache = {}
+
+
+def get_ann_index(record_name, extension, pb_dir, filebytes):
+    """
+    Get the index of an annotation file, building it if it has not been
+    cached, or if the file has changed since it was cached.
+    """
+    file_name = record_name + '.' + extension
+    if pb_dir is None:
+        file_id = (filebytes.shape[0], os.path.getmtime(file_name))
+    else:
+        file_id = (filebytes.shape[0],)
+
+    cached = _ann_index_cache.get((file_name, pb_dir))
+    if cached is not None and cached[0] == file_id:
+        return cached[1]
+
+    ann_index = AnnotationIndex.from_bytes(filebytes)
+    _ann_index_cache[(file_name, pb_dir)] = (file_id, ann_index)
+
+    return ann_index
+
+
 ## ------------- Annotation Field Specifications ------------- ##
 
 """
@@ -1647,7 +2185,7 @@ The read vs write default values are different for 2 reasons:
 ALLOWED_TYPES = {'record_name': (str), 'extension': (str),
                  'sample': (np.ndarray,), 'symbol': (list, np.ndarray),
                  'subtype': (np.ndarray,), 'chan': (np.ndarray,),
-                 'num': (np.ndarray,), 'aux_note': (list, np.ndarray),
+                 'num': (np.ndarray,), 'aux_note': (list, np.ndarray, dict),
                  'fs': _header.float_types, 'label_store': (np.ndarray,),
                  'description':(list, np.ndarray),
                  'custom_labels': (pd.DataFrame, list, tuple),
@@ -185,6 +185,35 @@ def _stream_annotation(file_name, pb_dir):
     return ann_data
 
 
+def _stream_annotation_blocks(file_name, pb_dir, block_size):
+    """
+    Stream a remote annotation file from physiobank in blocks. Yields
+    numpy uint8 arrays, followed by None once the end of the file is
+    reached.
+
+    Parameters
+    ----------
+    file_name : str
+        The name of the annotation file to be read.
+    pb_dir : str
+        The physiobank directory where the annotation file is located.
+    block_size : int
+        The number of bytes to request at a time.
+
+    """
+    # Full url of annotation file
+    url = posixpath.join(config.db_index_url, pb_dir, file_name)
+
+    # Get the content
+    response = requests.get(url, stream=True)
+    # Raise HTTPError if invalid url
+    response.raise_for_status()
+
+    for block in response.iter_content(chunk_size=block_size):
+        yield np.frombuffer(block, dtype=np.dtype('<u1'))
+    yield None
+
+
 def get_dbs():
     """
     Get a list of all the Physiobank databases available.
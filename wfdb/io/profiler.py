@@ -0,0 +1,137 @@
+import time
+
+
+# The callback receiving the timings of the read stages, or None when
+# profiling is disabled.
+_profiler = None
+
+
+def set_profiler(callback=None):
+    """
+    Set a callback to receive the timings of the stages of reading
+    records.
+
+    When set, `rdheader`, `_rd_dat_file`, `_blocks_to_samples`,
+    `_skew_sig`, `dac` and `convert_dtype` call it after each run as
+    `callback(stage, seconds, n_bytes)`, where `stage` is the function
+    name and `n_bytes` is the number of bytes it read or produced.
+
+    Parameters
+    ----------
+    callback : callable, optional
+        The function to call with each timing. Leave as default to
+        disable profiling.
+
+    Returns
+    -------
+    previous : callable
+        The previous callback, or None if profiling was disabled.
+
+    Examples
+    --------
+    >>> wfdb.set_profiler(lambda stage, seconds, n_bytes: print(stage, seconds))
+    >>> record = wfdb.rdrecord('sample-data/100')
+    >>> wfdb.set_profiler(None)
+
+    """
+    global _profiler
+    previous = _profiler
+    _profiler = callback
+    return previous
+
+
+def get_profiler():
+    """
+    Get the current profiler callback, or None if profiling is
+    disabled.
+    """
+    return _profiler
+
+
+def _start():
+    """
+    Get the start time of a stage, or None if profiling is disabled.
+    """
+    if _profiler is None:
+        return None
+    return time.perf_counter()
+
+
+def _stop(stage, t0, n_bytes):
+    """
+    Report the time since `t0` of a stage to the profiler.
+    """
+    callback = _profiler
+    if callback is not None:
+        callback(stage, time.perf_counter() - t0, n_bytes)
+
+
+def _nbytes(sig):
+    """
+    Get the number of bytes of a signal array, or of a list of channel
+    arrays.
+    """
+    if isinstance(sig, list):
+        return sum(s.nbytes for s in sig)
+    return sig.nbytes
+
+
+class ProfileCollector(object):
+    """
+    A profiler callback which aggregates the number of calls, the
+    time and the number of bytes of each stage.
+
+    The collector can be used as a context manager, which sets it as
+    the profiler on entry and restores the previous profiler on exit.
+
+    Attributes
+    ----------
+    stats : dict
+        The [n_calls, seconds, n_bytes] totals of each stage.
+
+    Examples
+    --------
+    >>> collector = wfdb.ProfileCollector()
+    >>> with collector:
+            record = wfdb.rdrecord('sample-data/100')
+    >>> print(collector.report())
+
+    """
+    def __init__(self):
+        self.stats = {}
+        self._previous = None
+
+    def __call__(self, stage, seconds, n_bytes):
+        stats = self.stats.setdefault(stage, [0, 0., 0])
+        stats[0] += 1
+        stats[1] += seconds
+        stats[2] += n_bytes
+
+    def __enter__(self):
+        self._previous = set_profiler(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        set_profiler(self._previous)
+        self._previous = None
+
+    def reset(self):
+        """
+        Clear the collected timings.
+        """
+        self.stats = {}
+
+    def report(self):
+        """
+        Get a table of the collected timings of each stage, in
+        decreasing order of total time.
+        """
+        lines = ['%-20s %8s %12s %12s %12s' % ('stage', 'calls', 'time (ms)',
+                                              'MB', 'MB/s')]
+        for stage, (n_calls, seconds, n_bytes) in sorted(
+                self.stats.items(), key=lambda item: -item[1][1]):
+            mb = n_bytes / 2 ** 20
+            lines.append('%-20s %8d %12.3f %12.3f %12.1f'
+                         % (stage, n_calls, seconds * 1e3, mb,
+                            mb / seconds if seconds else float('inf')))
+        return '\n'.join(lines)
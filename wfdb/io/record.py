@@ -11,6 +11,7 @@ import requests
 from . import _header
 from . import _signal
 from . import download
+from . import profiler
 
 import pdb
 
@@ -983,6 +984,7 @@ def rdheader(record_name, pb_dir=None, rd_segments=False):
                                    channels = [1,3])
 
     """
+    t0 = profiler._start()
     dir_name, base_record_name = os.path.split(record_name)
     dir_name = os.path.abspath(dir_name)
 
@@ -1048,6 +1050,11 @@ def rdheader(record_name, pb_dir=None, rd_segments=False):
     # Set the comments field
     record.comments = [line.strip(' \t#') for line in comment_lines]
 
+    if t0 is not None:
+        profiler._stop('rdheader', t0,
+                       sum(len(line) + 1 for line in header_lines
+                           + comment_lines))
+
     return record
 
 
@@ -1720,7 +1727,9 @@ SIGNAL_CLASSES = pd.DataFrame(
     data=[['Blood Pressure', 'pressure', ['bp','abp','pap','cvp']], # bp
           ['Carbon Dioxide', 'percentage', ['co2', 'pco2']], # co2
           ['Carbon Monoxide', 'percentage', ['co']], # co
-          ['Electrocardiogram', 'voltage', ['i','ii','iii','iv','v','avr']], # ecg
+          ['Electrocardiogram', 'voltage', ['i','ii','iii','iv','v','avr',
+                                            'avl','avf','mli','mlii','mliii',
+                                            'v1','v2','v3','v4','v5','v6']], # ecg
           ['Electroencephalogram', 'voltage', ['eeg']], # eeg
           ['Electromyograph', 'voltage', ['emg']], # emg
           ['Electrooculograph', 'voltage', ['eog']], # eog
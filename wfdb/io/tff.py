@@ -37,10 +37,10 @@ def rdtff(file_name, cut_end=False):
 
     Notes
     -----
-    This function is slow because tff files may contain any number of
-    escape sequences interspersed with the signals. There is no way to
-    know the number of samples/escape sequences beforehand, so the file
-    is inefficiently parsed a small chunk at a time.
+    tff files may contain any number of escape sequences interspersed
+    with the signals, so the number of samples is not known beforehand.
+    The whole signal is read into memory and scanned for them. To read
+    long files with bounded memory, use `iter_tff`.
 
     It is recommended that you convert your tff files to wfdb format.
 
@@ -57,6 +57,159 @@ def rdtff(file_name, cut_end=False):
     return signal, fields, markers, triggers
 
 
+def iter_tff(file_name, chunk=10000, cut_end=False):
+    """
+    Read a tff file incrementally, yielding blocks of frames along with
+    the markers and triggers inside them.
+
+    The file is read and scanned for escape sequences about one block
+    at a time, so that the memory used is bounded by the block size
+    rather than the file size. The concatenated blocks are the same as
+    the output of `rdtff`.
+
+    Parameters
+    ----------
+    file_name : str
+        Name of the .tff file to read
+    chunk : int, optional
+        The number of frames in each yielded block. The last block may
+        contain fewer frames.
+    cut_end : bool, optional
+        If True, cuts out the last sample for all channels. See `rdtff`.
+
+    Yields
+    ------
+    signal : numpy array
+        A 2d numpy array storing the next block of physical signals.
+    fields : dict
+        A dictionary containing several key attributes of the read
+        record.
+    markers : numpy array
+        A 1d numpy array storing the marker locations inside the block,
+        as frame numbers from the start of the record. Markers after the
+        last frame are in the last block.
+    triggers : numpy array
+        A 1d numpy array storing the trigger locations inside the block,
+        as frame numbers from the start of the record.
+
+    Examples
+    --------
+    >>> for signal, fields, markers, triggers in wfdb.io.iter_tff('a.tff'):
+            process(signal)
+
+    """
+    file_size = os.path.getsize(file_name)
+    with open(file_name, 'rb') as fp:
+        fields, file_fields = _rdheader(fp)
+        header_size = file_fields['header_size']
+        n_sig = file_fields['n_sig']
+        byte_width = int(file_fields['bit_width'] / 8)
+        dtype = _np_dtype(byte_width, file_fields['is_signed'])
+        frame_size = n_sig * byte_width
+
+        signal_size = file_size - header_size
+        max_samples = int(signal_size / byte_width)
+        max_samples = max_samples - max_samples % n_sig
+        stop = signal_size
+        if cut_end:
+            stop -= frame_size - 1
+        # Enough bytes for a block, and at least one frame or escape
+        # sequence header
+        read_size = max(chunk * frame_size, frame_size + 4)
+
+        # The frames and escape sequences not yet yielded
+        frames = [np.empty((0, n_sig), dtype=dtype)]
+        n_frames = 0
+        markers = []
+        triggers = []
+        # The frame number of the start of the next block
+        block_start = 0
+        # The byte position of the next frame, and its frame number
+        pos = 0
+        frame_num = 0
+
+        while True:
+            done = pos >= min(stop, signal_size)
+            if not done:
+                fp.seek(header_size + pos)
+                # Read one more byte than the block, so that an escape
+                # tag at the end of the block is seen whole. No frame
+                # or escape sequence starts at that byte.
+                data = np.fromfile(fp, dtype='uint8', count=read_size + 1)
+                at_end = len(data) <= read_size
+                segments, escapes, scan_pos = _scan_block(
+                    data, n_sig, byte_width,
+                    stop - pos if at_end else min(stop - pos, read_size),
+                    frame_num)
+                for start, end in segments:
+                    frames.append(data[start:end].view(dtype).reshape((-1, n_sig)))
+                    n_frames += (end - start) // frame_size
+                for escape_frame, escape_type in escapes:
+                    if escape_type == 1:
+                        markers.append(escape_frame)
+                    elif escape_type == 2:
+                        triggers.append(escape_frame)
+                frame_num = block_start + n_frames
+                pos += scan_pos
+                # The scan stopped at the end of the file
+                done = at_end and scan_pos <= len(data)
+
+            if done:
+                # Read any remaining bytes one frame at a time
+                fp.seek(header_size + pos)
+                stop_byte = header_size + stop if cut_end else None
+                tail, tail_markers, tail_triggers = _rd_tail(
+                    fp, stop_byte, n_sig, dtype, frame_num * n_sig, max_samples)
+                if len(tail):
+                    frames.append(tail.reshape((-1, n_sig)))
+                    n_frames += len(tail) // n_sig
+                markers += tail_markers
+                triggers += tail_triggers
+
+            # Yield the full blocks, keeping at least one frame after
+            # them, so that markers after the last frame of the record
+            # are in the last block.
+            while n_frames > chunk:
+                block_start += chunk
+                block, frames, markers, triggers = _pop_block(
+                    frames, markers, triggers, chunk, block_start)
+                n_frames -= chunk
+                yield (block[0], fields) + block[1:]
+
+            if done:
+                break
+
+        if n_frames or markers or triggers:
+            block = _pop_block(frames, markers, triggers, n_frames, np.inf)[0]
+            yield (block[0], fields) + block[1:]
+
+
+def _pop_block(frames, markers, triggers, n_frames, block_end):
+    """
+    Split the first frames, and the markers and triggers before a frame
+    number, from the ones not yet yielded.
+
+    Returns
+    -------
+    block : tuple
+        The signal, markers and triggers of the block.
+    frames : list
+        The remaining frames.
+    markers : list
+        The remaining markers.
+    triggers : list
+        The remaining triggers.
+
+    """
+    # Keep the byte order of the file's samples
+    signal = np.concatenate(frames).astype(frames[0].dtype, copy=False)
+    block = (signal[:n_frames],
+             np.array([m for m in markers if m < block_end], dtype='int'),
+             np.array([t for t in triggers if t < block_end], dtype='int'))
+    return (block, [signal[n_frames:]], [m for m in markers if m >= block_end],
+            [t for t in triggers if t >= block_end])
+
+
 def _rdheader(fp):
     """
     Read header info of the windaq file
@@ -149,21 +302,20 @@ def _rdsignal(fp, file_size, header_size, n_sig, bit_width, is_signed, cut_end):
         If True, enables reading the end of files which appear to terminate
         with the incorrect number of samples (ie. sample not present for all channels),
         by checking and skipping the reading the end of such files.
-        Checking this option makes reading slower.
+
+    Notes
+    -----
+    The signal bytes are read at once and scanned for escape sequences
+    by `_scan_block`. Any incomplete frame or escape sequence left at
+    the end of the file is then read one frame at a time.
+
     """
     # Cannot initially figure out signal length because there
     # are escape sequences.
     fp.seek(header_size)
     signal_size = file_size - header_size
     byte_width = int(bit_width / 8)
-    # numpy dtype
-    dtype = str(byte_width)
-    if is_signed:
-        dtype = 'i' + dtype
-    else:
-        dtype = 'u' + dtype
-    # big endian
-    dtype = '>' + dtype
+    dtype = _np_dtype(byte_width, is_signed)
     # The maximum possible samples given the file size
     # All channels must be present
     max_samples = int(signal_size / byte_width)
@@ -175,18 +327,34 @@ def _rdsignal(fp, file_size, header_size, n_sig, bit_width, is_signed, cut_end):
     # Number of (total) samples read
     sample_num = 0
 
-    # Read one sample for all channels at a time
+    # Scan the signal bytes, excluding the last frame start positions
+    # skipped by cut_end.
+    data = np.fromfile(fp, dtype='uint8', count=signal_size)
+    stop = len(data)
     if cut_end:
-        stop_byte = file_size - n_sig * byte_width + 1
-        while fp.tell() < stop_byte:
-            chunk = fp.read(2)
-            sample_num = _get_sample(fp, chunk, n_sig, dtype, signal, markers, triggers, sample_num)
-    else:
-        while True:
-            chunk = fp.read(2)
-            if not chunk:
-                break
-            sample_num = _get_sample(fp, chunk, n_sig, dtype, signal, markers, triggers, sample_num)
+        stop -= n_sig * byte_width - 1
+    segments, escapes, pos = _scan_block(data, n_sig, byte_width, stop)
+
+    for start, end in segments:
+        n_samp = (end - start) // byte_width
+        signal[sample_num:sample_num + n_samp] = data[start:end].view(dtype)
+        sample_num += n_samp
+    for frame_num, escape_type in escapes:
+        if escape_type == 1:
+            markers.append(frame_num)
+        elif escape_type == 2:
+            triggers.append(frame_num)
+    del data
+
+    # Read any remaining bytes one frame at a time
+    fp.seek(header_size + pos)
+    stop_byte = file_size - n_sig * byte_width + 1 if cut_end else None
+    tail, tail_markers, tail_triggers = _rd_tail(fp, stop_byte, n_sig, dtype,
+                                                 sample_num, max_samples)
+    signal[sample_num:sample_num + len(tail)] = tail
+    sample_num += len(tail)
+    markers += tail_markers
+    triggers += tail_triggers
 
     # No more bytes to read. Reshape output arguments.
     signal = signal[:sample_num]
@@ -196,6 +364,142 @@ def _rdsignal(fp, file_size, header_size, n_sig, bit_width, is_signed, cut_end):
     return signal, markers, triggers
 
 
+def _np_dtype(byte_width, is_signed):
+    """
+    Get the big endian numpy dtype of the samples
+    """
+    dtype = str(byte_width)
+    if is_signed:
+        dtype = 'i' + dtype
+    else:
+        dtype = 'u' + dtype
+    return '>' + dtype
+
+
+def _scan_block(data, n_sig, byte_width, stop=None, frame_num=0):
+    """
+    Find the frames and escape sequences in a block of signal bytes
+    starting at a frame.
+
+    An escape sequence starts with the int16 value -32768 where a frame
+    would start, and is followed by a uint8 type, a uint8 length, and
+    that many data bytes padded to an even number. Only positions which
+    frames could start at are checked, which depend on the previous
+    escape sequences. The candidate positions are grouped by their
+    remainder modulo the frame size, so that the scan jumps from one
+    escape sequence to the next.
+
+    Parameters
+    ----------
+    data : numpy array
+        The uint8 signal bytes.
+    n_sig : int
+        The number of signals.
+    byte_width : int
+        The number of bytes per sample.
+    stop : int, optional
+        No frame or escape sequence starting at or after this position
+        is read. Default is the length of `data`.
+    frame_num : int, optional
+        The number of frames before the block.
+
+    Returns
+    -------
+    segments : list
+        The (start, end) byte positions of the runs of frames.
+    escapes : list
+        The (frame number, type) of each escape sequence, where the
+        frame number is that of the next frame.
+    pos : int
+        The position where the scan stopped: at `stop`, at an
+        incomplete frame or escape sequence at the end of the block, or
+        past the end of the block if the data of the last escape
+        sequence runs past it.
+
+    """
+    n_bytes = len(data)
+    if stop is None:
+        stop = n_bytes
+    frame_size = n_sig * byte_width
+    # Frames may start up to here
+    frame_stop = min(stop, n_bytes - frame_size + 1)
+
+    candidates = np.flatnonzero((data[:-1] == 0x80) & (data[1:] == 0))
+    remainders = candidates % frame_size
+    order = np.lexsort((candidates, remainders))
+    candidates = candidates[order]
+    bounds = np.searchsorted(remainders[order], np.arange(frame_size + 1))
+
+    segments = []
+    escapes = []
+    pos = 0
+    while True:
+        # The next escape sequence at a frame start
+        group = candidates[bounds[pos % frame_size]:bounds[pos % frame_size + 1]]
+        i = np.searchsorted(group, pos)
+        escape_pos = group[i] if i < len(group) else n_bytes
+
+        # The frames before it
+        n_frames = max(0, -(-(min(escape_pos, frame_stop) - pos) // frame_size))
+        if n_frames:
+            segments.append((pos, pos + n_frames * frame_size))
+            pos += n_frames * frame_size
+            frame_num += n_frames
+
+        if pos != escape_pos or pos >= stop or pos + 4 > n_bytes:
+            break
+        escapes.append((frame_num, int(data[pos + 2])))
+        data_len = int(data[pos + 3])
+        pos += 4 + data_len + data_len % 2
+
+    return segments, escapes, int(pos)
+
+
+def _rd_tail(fp, stop_byte, n_sig, dtype, sample_num, max_samples):
+    """
+    Read the incomplete frame or escape sequence left at the end of a
+    tff file, one frame at a time from the current file position.
+
+    Parameters
+    ----------
+    stop_byte : int
+        No frame or escape sequence is read from this file position.
+        If None, everything up to the end of the file is read.
+    sample_num : int
+        The number of samples read before.
+    max_samples : int
+        The maximum number of samples given the file size.
+
+    Returns
+    -------
+    signal : numpy array
+        The 1d array of samples read.
+    markers : list
+        The marker locations.
+    triggers : list
+        The trigger locations.
+
+    """
+    # Once the scan stops, at most one frame is left, which may not fit
+    # in the maximum number of samples.
+    signal = np.empty(max(min(n_sig, max_samples - sample_num), 0),
+                      dtype=dtype)
+    markers = []
+    triggers = []
+    tail_num = 0
+    while stop_byte is None or fp.tell() < stop_byte:
+        chunk = fp.read(2)
+        if not chunk:
+            break
+        tail_num = _get_sample(fp, chunk, n_sig, dtype, signal, markers,
+                               triggers, tail_num)
+
+    frame_num = sample_num // n_sig
+    markers = [frame_num + m for m in markers]
+    triggers = [frame_num + t for t in triggers]
+    return signal[:tail_num], markers, triggers
+
+
 def _get_sample(fp, chunk, n_sig, dtype, signal, markers, triggers, sample_num):
     tag = struct.unpack('>h', chunk)[0]
     # Escape sequence
@@ -1,3 +1,4 @@
+from matplotlib.collections import LineCollection
 import matplotlib.pyplot as plt
 import numpy as np
 import os
@@ -11,7 +12,8 @@ from ..io.annotation import Annotation
 def plot_items(signal=None, ann_samp=None, ann_sym=None, fs=None,
                time_units='samples', sig_name=None, sig_units=None,
                ylabel=None, title=None, sig_style=[''], ann_style=['r*'],
-               ecg_grids=[], figsize=None, return_fig=False):
+               ecg_grids=[], figsize=None, return_fig=False,
+               max_points=10000):
     """
     Subplot individual channels of signals and/or annotations.
 
@@ -78,6 +80,13 @@ def plot_items(signal=None, ann_samp=None, ann_sym=None, fs=None,
         'figsize' argument passed into matplotlib.pyplot's `figure` function.
     return_fig : bool, optional
         Whether the figure is to be returned as an output argument.
+    max_points : int, optional
+        The maximum number of points to plot for each signal channel.
+        Longer signals are divided into `max_points` / 2 intervals, and
+        only the minimum and maximum samples of each interval are
+        plotted, in order, which preserves the envelope of the signal.
+        The annotations are still placed on the samples of the full
+        signal. Set to None to plot every sample.
 
     Returns
     -------
@@ -104,7 +113,8 @@ def plot_items(signal=None, ann_samp=None, ann_sym=None, fs=None,
     fig, axes = create_figure(n_subplots, figsize)
 
     if signal is not None:
-        plot_signal(signal, sig_len, n_sig, fs, time_units, sig_style, axes)
+        plot_signal(signal, sig_len, n_sig, fs, time_units, sig_style, axes,
+                    max_points)
 
     if ann_samp is not None:
         plot_annotation(ann_samp, n_annot, ann_sym, signal, n_sig, fs,
@@ -154,7 +164,8 @@ def create_figure(n_subplots, figsize):
     return fig, axes
 
 
-def plot_signal(signal, sig_len, n_sig, fs, time_units, sig_style, axes):
+def plot_signal(signal, sig_len, n_sig, fs, time_units, sig_style, axes,
+                max_points=None):
     "Plot signal channels"
 
     # Extend signal style if necesary
@@ -169,12 +180,70 @@ def plot_signal(signal, sig_len, n_sig, fs, time_units, sig_style, axes):
                              'hours':fs * 3600}
         t = np.linspace(0, sig_len-1, sig_len) / downsample_factor[time_units]
 
+    # Plot the envelope of long signals
+    if max_points and sig_len > max_points:
+        sample, signal = minmax_decimate(signal, max_points // 2)
+        t = t[sample]
+
     # Plot the signals
     if signal.ndim == 1:
         axes[0].plot(t, signal, sig_style[0], zorder=3)
     else:
         for ch in range(n_sig):
-            axes[ch].plot(t, signal[:,ch], sig_style[ch], zorder=3)
+            t_ch = t if t.ndim == 1 else t[:, ch]
+            axes[ch].plot(t_ch, signal[:,ch], sig_style[ch], zorder=3)
+
+
+def minmax_decimate(signal, n_buckets):
+    """
+    Reduce a signal to the minimum and maximum samples of each of a
+    number of equal intervals, in order of occurrence.
+
+    Parameters
+    ----------
+    signal : numpy array
+        The 1d or 2d signal to decimate. Each channel of a 2d signal is
+        decimated independently.
+    n_buckets : int
+        The number of intervals to divide the signal into.
+
+    Returns
+    -------
+    sample : numpy array
+        The indices of the kept samples of each channel, with the same
+        number of dimensions as `signal`.
+    signal : numpy array
+        The values of the kept samples.
+
+    """
+    sig_len = signal.shape[0]
+    n_buckets = max(min(n_buckets, sig_len), 1)
+    bucket_len = -(-sig_len // n_buckets)
+    # Pad the last bucket with its last sample
+    n_pad = n_buckets * bucket_len - sig_len
+    if n_pad:
+        padded = np.concatenate([signal, np.repeat(signal[-1:], n_pad, axis=0)])
+    else:
+        padded = signal
+    buckets = padded.reshape((n_buckets, bucket_len) + signal.shape[1:])
+
+    # argmin and argmax pick any nan of a bucket, so that gaps in the
+    # signal are still shown
+    i_min = np.argmin(buckets, axis=1)
+    i_max = np.argmax(buckets, axis=1)
+    start = np.arange(n_buckets) * bucket_len
+    if signal.ndim == 2:
+        start = start[:, np.newaxis]
+
+    # Each bucket's minimum and maximum, in order of occurrence
+    sample = np.empty((2 * n_buckets,) + signal.shape[1:], dtype='int64')
+    sample[::2] = start + np.minimum(i_min, i_max)
+    sample[1::2] = start + np.maximum(i_min, i_max)
+    sample = np.minimum(sample, sig_len - 1)
+
+    if signal.ndim == 1:
+        return sample, signal[sample]
+    return sample, signal[sample, np.arange(signal.shape[1])]
 
 
 def plot_annotation(ann_samp, n_annot, ann_sym, signal, n_sig, fs, time_units,
@@ -233,23 +302,36 @@ def plot_ecg_grids(ecg_grids, fs, units, time_units, axes):
         min_x, max_x = np.min(minor_ticks_x), np.max(minor_ticks_x)
         min_y, max_y = np.min(minor_ticks_y), np.max(minor_ticks_y)
 
-        for tick in minor_ticks_x:
-            axes[ch].plot([tick, tick], [min_y,  max_y], c='#ededed',
-                          marker='|', zorder=1)
-        for tick in major_ticks_x:
-            axes[ch].plot([tick, tick], [min_y, max_y], c='#bababa',
-                          marker='|', zorder=2)
-        for tick in minor_ticks_y:
-            axes[ch].plot([min_x, max_x], [tick, tick], c='#ededed',
-                          marker='_', zorder=1)
-        for tick in major_ticks_y:
-            axes[ch].plot([min_x, max_x], [tick, tick], c='#bababa',
-                          marker='_', zorder=2)
+        # One collection of lines for each grid class
+        for ticks_x, ticks_y, color, zorder in [
+                (minor_ticks_x, minor_ticks_y, '#ededed', 1),
+                (major_ticks_x, major_ticks_y, '#bababa', 2)]:
+            axes[ch].add_collection(LineCollection(
+                grid_segments(ticks_x, ticks_y, min_x, max_x, min_y, max_y),
+                colors=color, zorder=zorder))
 
         # Plotting the lines changes the graph. Set the limits back
         axes[ch].set_xlim(auto_xlims)
         axes[ch].set_ylim(auto_ylims)
 
+
+def grid_segments(ticks_x, ticks_y, min_x, max_x, min_y, max_y):
+    """
+    Get the line segments of the vertical grid lines at `ticks_x` and
+    the horizontal grid lines at `ticks_y`, as an array of shape
+    (n_lines, 2, 2).
+    """
+    vertical = np.empty((len(ticks_x), 2, 2))
+    vertical[:, :, 0] = np.asarray(ticks_x)[:, np.newaxis]
+    vertical[:, 0, 1] = min_y
+    vertical[:, 1, 1] = max_y
+    horizontal = np.empty((len(ticks_y), 2, 2))
+    horizontal[:, 0, 0] = min_x
+    horizontal[:, 1, 0] = max_x
+    horizontal[:, :, 1] = np.asarray(ticks_y)[:, np.newaxis]
+    return np.concatenate([vertical, horizontal])
+
+
 def calc_ecg_grids(minsig, maxsig, sig_units, fs, maxt, time_units):
     """
     Calculate tick intervals for ecg grids
@@ -331,7 +413,8 @@ def label_figure(axes, n_subplots, time_units, sig_name, sig_units, ylabel,
 
 def plot_wfdb(record=None, annotation=None, plot_sym=False,
               time_units='samples', title=None, sig_style=[''],
-              ann_style=['r*'], ecg_grids=[], figsize=None, return_fig=False):
+              ann_style=['r*'], ecg_grids=[], figsize=None, return_fig=False,
+              max_points=10000):
     """
     Subplot individual channels of a wfdb record and/or annotation.
 
@@ -384,6 +467,11 @@ def plot_wfdb(record=None, annotation=None, plot_sym=False,
         'figsize' argument passed into matplotlib.pyplot's `figure` function.
     return_fig : bool, optional
         Whether the figure is to be returned as an output argument.
+    max_points : int, optional
+        The maximum number of points to plot for each signal channel.
+        Longer signals are plotted as the minimum and maximum samples of
+        `max_points` / 2 intervals. Set to None to plot every sample.
+        See `plot_items`.
 
     Returns
     -------
@@ -411,7 +499,8 @@ def plot_wfdb(record=None, annotation=None, plot_sym=False,
                       title=(title or record_name),
                       sig_style=sig_style,
                       ann_style=ann_style, ecg_grids=ecg_grids,
-                      figsize=figsize, return_fig=return_fig)
+                      figsize=figsize, return_fig=return_fig,
+                      max_points=max_points)
 
 
 def get_wfdb_plot_items(record, annotation, plot_sym):
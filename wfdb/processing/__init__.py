@@ -3,4 +3,4 @@ from .basic import (resample_ann, resample_sig, resample_singlechan,
 from .evaluate import Comparitor, compare_annotations, benchmark_mitdb
 from .hr import compute_hr, calc_rr, calc_mean_hr
 from .peaks import find_peaks, find_local_peaks, correct_peaks
-from .qrs import XQRS, xqrs_detect, gqrs_detect
+from .qrs import XQRS, StreamingXQRS, xqrs_detect, gqrs_detect, detect_many
@@ -1,83 +1,118 @@
+from fractions import Fraction
+
 import numpy as np
 from scipy import signal
 
 from ..io.annotation import Annotation
+from ..io._signal import upround
 
 
-def resample_ann(resampled_t, ann_sample):
+def resample_ann(resampled_t, ann_sample, sig_len=None):
     """
     Compute the new annotation indices
 
     Parameters
     ----------
-    resampled_t : numpy array
-        Array of signal locations as returned by scipy.signal.resample
+    resampled_t : numpy array, or float
+        Array of signal locations as returned by scipy.signal.resample,
+        or the spacing of evenly spaced signal locations starting at 0,
+        as returned by `resample_sig` with method='poly'.
     ann_sample : numpy array
         Array of annotation locations
+    sig_len : int, optional
+        The number of evenly spaced signal locations, if `resampled_t`
+        is their spacing. Later annotations go to the last location.
 
     Returns
     -------
     resampled_ann_sample : numpy array
-        Array of resampled annotation locations
+        Array of resampled annotation locations, in increasing order.
+        Each annotation is moved to the nearest signal location, or to
+        the later one if it is halfway between two.
 
     """
-    tmp = np.zeros(len(resampled_t), dtype='int16')
-    j = 0
-    tprec = resampled_t[j]
-    for i, v in enumerate(ann_sample):
-        while True:
-            d = False
-            if v < tprec:
-                j -= 1
-                tprec = resampled_t[j]
-
-            if j+1 == len(resampled_t):
-                tmp[j] += 1
-                break
-
-            tnow = resampled_t[j+1]
-            if tprec <= v and v <= tnow:
-                if v-tprec < tnow-v:
-                    tmp[j] += 1
-                else:
-                    tmp[j+1] += 1
-                d = True
-            j += 1
-            tprec = tnow
-            if d:
-                break
-
-    idx = np.where(tmp>0)[0].astype('int64')
-    res = []
-    for i in idx:
-        for j in range(tmp[i]):
-            res.append(i)
-    assert len(res) == len(ann_sample)
-
-    return np.asarray(res, dtype='int64')
-
-
-def resample_sig(x, fs, fs_target):
+    ann_sample = np.asarray(ann_sample)
+
+    if np.ndim(resampled_t) == 0:
+        # Evenly spaced locations, at multiples of the spacing
+        step = float(resampled_t)
+        left = np.floor(ann_sample / step).astype('int64')
+        left[left * step > ann_sample] -= 1
+        left[(left + 1) * step <= ann_sample] += 1
+        left = np.maximum(left, 0)
+        tprec = left * step
+        tnow = (left + 1) * step
+        left += (ann_sample - tprec >= tnow - ann_sample)
+        if sig_len is not None:
+            left = np.minimum(left, sig_len - 1)
+        return np.sort(left)
+
+    # The grid point at or before each annotation
+    n_t = len(resampled_t)
+    left = np.searchsorted(resampled_t, ann_sample, side='right') - 1
+    left = np.clip(left, 0, n_t - 1)
+
+    # Move to the next point if it is at least as close. Annotations
+    # after the last point go to the last point.
+    inner = left < n_t - 1
+    tprec = resampled_t[left[inner]]
+    tnow = resampled_t[left[inner] + 1]
+    v = ann_sample[inner]
+    left[inner] += (v - tprec >= tnow - v)
+
+    return np.sort(left).astype('int64')
+
+
+def resample_sig(x, fs, fs_target, method='fft', chunk_size=None):
     """
     Resample a signal to a different frequency.
 
     Parameters
     ----------
     x : numpy array
-        Array containing the signal
+        Array containing the signal, or a 2d array with one channel per
+        column.
     fs : int, or float
         The original sampling frequency
     fs_target : int, or float
         The target frequency
+    method : str, optional
+        'fft' to resample with scipy.signal.resample, or 'poly' to
+        resample with the polyphase filter of
+        scipy.signal.resample_poly. The ratio of frequencies is
+        approximated by a fraction with a denominator of at most 1000.
+    chunk_size : int, optional
+        With method='poly', the number of input samples to resample at
+        a time. The chunks are resampled with enough overlap that the
+        result is the same as resampling all at once, and `x` may be a
+        memory-mapped array larger than the available memory.
 
     Returns
     -------
     resampled_x : numpy array
         Array of the resampled signal values
-    resampled_t : numpy array
-        Array of the resampled signal locations
+    resampled_t : numpy array, or float
+        Array of the resampled signal locations, in samples of the
+        original signal. With method='poly', the locations are evenly
+        spaced from 0 and their spacing is returned instead.
 
     """
+    if method == 'poly':
+        if fs == fs_target:
+            return x, 1.
+
+        ratio = Fraction(fs_target / fs).limit_denominator(1000)
+        up, down = ratio.numerator, ratio.denominator
+        if chunk_size is None:
+            resampled_x = signal.resample_poly(x, up, down, axis=0)
+        else:
+            resampled_x = _resample_poly_chunks(x, up, down, chunk_size)
+        # Trim to the same length as the fft method
+        resampled_x = resampled_x[:x.shape[0] * up // down]
+
+        return resampled_x, down / up
+    elif method != 'fft':
+        raise ValueError("The method must be 'fft' or 'poly'")
 
     t = np.arange(x.shape[0]).astype('float64')
 
@@ -86,13 +121,48 @@ def resample_sig(x, fs, fs_target):
 
     new_length = int(x.shape[0]*fs_target/fs)
     resampled_x, resampled_t = signal.resample(x, num=new_length, t=t)
-    assert resampled_x.shape == resampled_t.shape and resampled_x.shape[0] == new_length
+    assert resampled_x.shape[0] == resampled_t.shape[0] and resampled_x.shape[0] == new_length
     assert np.all(np.diff(resampled_t) > 0)
 
     return resampled_x, resampled_t
 
 
-def resample_singlechan(x, ann, fs, fs_target):
+def _resample_poly_chunks(x, up, down, chunk_size):
+    """
+    Resample a signal with scipy.signal.resample_poly, `chunk_size`
+    input samples at a time.
+
+    Each chunk starts at a multiple of `down`, so that its output
+    samples fall on those of the full signal, and is extended on both
+    sides by more than the half length of the filter.
+
+    """
+    n_samp = x.shape[0]
+    n_out = -(-n_samp * up // down)
+    # scipy's filter has 10*max(up, down) taps on each side of its
+    # center, at the upsampled rate
+    margin = upround(-(-10 * max(up, down) // up) + 1, down)
+    step = upround(max(chunk_size, 1), down)
+
+    resampled_x = None
+    for start in range(0, n_samp, step):
+        end = min(start + step, n_samp)
+        pad_start = max(start - margin, 0)
+        pad_end = min(end + margin, n_samp)
+        chunk = signal.resample_poly(x[pad_start:pad_end], up, down, axis=0)
+        if resampled_x is None:
+            resampled_x = np.empty((n_out,) + x.shape[1:], dtype=chunk.dtype)
+
+        out_start = start * up // down
+        out_end = n_out if end == n_samp else end * up // down
+        offset = pad_start * up // down
+        resampled_x[out_start:out_end] = chunk[out_start - offset:
+                                               out_end - offset]
+
+    return resampled_x
+
+
+def resample_singlechan(x, ann, fs, fs_target, method='fft', chunk_size=None):
     """
     Resample a single-channel signal with its annotations
 
@@ -106,6 +176,10 @@ def resample_singlechan(x, ann, fs, fs_target):
         The original frequency
     fs_target : int, or float
         The target frequency
+    method : str, optional
+        The resampling method, 'fft' or 'poly'. See `resample_sig`.
+    chunk_size : int, optional
+        The chunk size for method='poly'. See `resample_sig`.
 
     Returns
     -------
@@ -116,9 +190,10 @@ def resample_singlechan(x, ann, fs, fs_target):
 
     """
 
-    resampled_x, resampled_t = resample_sig(x, fs, fs_target)
+    resampled_x, resampled_t = resample_sig(x, fs, fs_target, method,
+                                            chunk_size)
 
-    new_sample = resample_ann(resampled_t, ann.sample)
+    new_sample = resample_ann(resampled_t, ann.sample, resampled_x.shape[0])
     assert ann.sample.shape == new_sample.shape
 
     resampled_ann = Annotation(record_name=ann.record_name,
@@ -134,7 +209,8 @@ def resample_singlechan(x, ann, fs, fs_target):
     return resampled_x, resampled_ann
 
 
-def resample_multichan(xs, ann, fs, fs_target, resamp_ann_chan=0):
+def resample_multichan(xs, ann, fs, fs_target, resamp_ann_chan=0,
+                       method='fft', chunk_size=None):
     """
     Resample multiple channels with their annotations
 
@@ -149,7 +225,12 @@ def resample_multichan(xs, ann, fs, fs_target, resamp_ann_chan=0):
     fs_target : int, or float
         The target frequency
     resample_ann_channel : int, optional
-        The signal channel used to compute new annotation indices
+        The signal channel used to compute new annotation indices. All
+        channels share the same resampled locations.
+    method : str, optional
+        The resampling method, 'fft' or 'poly'. See `resample_sig`.
+    chunk_size : int, optional
+        The chunk size for method='poly'. See `resample_sig`.
 
     Returns
     -------
@@ -161,15 +242,11 @@ def resample_multichan(xs, ann, fs, fs_target, resamp_ann_chan=0):
     """
     assert resamp_ann_chan < xs.shape[1]
 
-    lx = []
-    lt = None
-    for chan in range(xs.shape[1]):
-        resampled_x, resampled_t = resample_sig(xs[:, chan], fs, fs_target)
-        lx.append(resampled_x)
-        if chan == resamp_ann_chan:
-            lt = resampled_t
+    # Resample all the channels at once
+    resampled_xs, resampled_t = resample_sig(xs, fs, fs_target, method,
+                                             chunk_size)
 
-    new_sample = resample_ann(lt, ann.sample)
+    new_sample = resample_ann(resampled_t, ann.sample, resampled_xs.shape[0])
     assert ann.sample.shape == new_sample.shape
 
     resampled_ann = Annotation(record_name=ann.record_name,
@@ -182,7 +259,7 @@ def resample_multichan(xs, ann, fs, fs_target, resamp_ann_chan=0):
                                aux_note=ann.aux_note,
                                fs=fs_target)
 
-    return np.column_stack(lx), resampled_ann
+    return resampled_xs, resampled_ann
 
 
 def normalize_bound(sig, lb=0, ub=1):
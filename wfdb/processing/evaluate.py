@@ -1,4 +1,6 @@
 from multiprocessing import cpu_count, Pool
+import os
+import time
 
 import matplotlib.pyplot as plt
 import numpy as np
@@ -6,7 +8,7 @@ import requests
 
 from ..io.annotation import rdann
 from ..io.download import get_record_list
-from ..io.record import rdsamp
+from ..io.record import rdsamp, dl_database
 
 
 class Comparitor(object):
@@ -139,63 +141,145 @@ class Comparitor(object):
         x-x--------x-----x
 
         """
-        test_samp_num = 0
+        n_ref = self.n_ref
+        n_test = self.n_test
+        if not n_ref or not n_test:
+            self._calc_stats()
+            return
+
+        ref_sample = self.ref_sample
+        test_sample = self.test_sample
+
+        # The closest test sample to each reference sample, when searching
+        # from the first test sample. The candidates are the first test
+        # sample at or after the reference sample, and the first of the
+        # test samples equal to the one before it.
+        after = np.searchsorted(test_sample, ref_sample)
+        before = np.searchsorted(test_sample,
+                                 test_sample[np.maximum(after - 1, 0)])
+        diff_before = np.abs(ref_sample - test_sample[before])
+        diff_after = np.abs(test_sample[np.minimum(after, n_test - 1)]
+                            - ref_sample)
+        use_after = (after > 0) & (after < n_test) & (diff_after < diff_before)
+        closest = np.where(use_after, after, before)
+        smallest_diff = np.where(use_after, diff_after, diff_before)
+
+        # Contested test samples, which are closer to the next reference
+        # sample.
+        contested = np.zeros(n_ref, dtype='bool')
+        contested[:-1] = ((closest[:-1] == closest[1:])
+                          & (smallest_diff[1:] < smallest_diff[:-1]))
+
+        matching = np.where(smallest_diff < self.window_width, closest, -1)
+        # The start of the search for the next reference sample. -1 keeps
+        # the current start.
+        next_start = closest + 1
+
+        # The contested reference samples may take the previous test
+        # sample, if it is not taken by the previous reference sample.
+        prev_matching = np.append(-1, matching[:-1])
+        prev_diff = np.abs(ref_sample - test_sample[np.maximum(closest - 1, 0)])
+        use_prev = contested & (closest > 0) & (closest - 1 != prev_matching)
+        matching[contested] = -1
+        matching[use_prev & (prev_diff < self.window_width)] = (
+            closest[use_prev & (prev_diff < self.window_width)] - 1)
+        next_start[contested] = -1
+        next_start[use_prev] = closest[use_prev]
+
+        start = np.maximum.accumulate(np.append(0, next_start[:-1]))
+
+        # The above holds for the reference samples whose search start is
+        # not past their closest test sample, or that of the next
+        # reference sample. Consecutive contested reference samples
+        # depend on each other's matches.
+        limit = np.append(closest, n_test)
+        valid = ((start <= limit[:-1]) & (start <= limit[1:])
+                 & (start < n_test))
+        valid[1:] &= ~(contested[1:] & contested[:-1])
+        invalid = np.where(~valid)[0]
+
+        # Take the matches up to each invalid reference sample, and match
+        # from there one at a time, until the search start and previous
+        # match are the same as above again.
         ref_samp_num = 0
+        while ref_samp_num < n_ref:
+            stop = invalid[np.searchsorted(invalid, ref_samp_num):][:1]
+            stop = stop[0] if len(stop) else n_ref
+            self.matching_sample_nums[ref_samp_num:stop] = matching[ref_samp_num:stop]
+            ref_samp_num = stop
+            if ref_samp_num == n_ref:
+                break
+
+            test_samp_num = start[ref_samp_num]
+            while test_samp_num < n_test:
+                test_samp_num = self._match_ref(ref_samp_num, test_samp_num)
+                ref_samp_num += 1
+                if ref_samp_num == n_ref or (
+                        test_samp_num == start[ref_samp_num]
+                        and self.matching_sample_nums[ref_samp_num - 1]
+                        == matching[ref_samp_num - 1]):
+                    break
+            # The remaining reference samples are unmatched
+            if test_samp_num >= n_test:
+                break
 
-        # Iterate through the reference sample numbers
-        while ref_samp_num < self.n_ref and test_samp_num < self.n_test:
-            # Get the closest testing sample number for this reference sample
-            closest_samp_num, smallest_samp_diff = (
-                self._get_closest_samp_num(ref_samp_num, test_samp_num))
-            # Get the closest testing sample number for the next reference
-            # sample. This doesn't need to be called for the last index.
-            if ref_samp_num < self.n_ref - 1:
-                closest_samp_num_next, smallest_samp_diff_next = (
-                    self._get_closest_samp_num(ref_samp_num + 1, test_samp_num))
-            else:
-                # Set non-matching value if there is no next reference sample
-                # to compete for the test sample
-                closest_samp_num_next = -1
-
-            # Found a contested test sample number. Decide which
-            # reference sample it belongs to. If the sample is closer to
-            # the next reference sample, leave it to the next reference
-            # sample and label this reference sample as unmatched.
-            if (closest_samp_num == closest_samp_num_next
-                    and smallest_samp_diff_next < smallest_samp_diff):
-                # Get the next closest sample for this reference sample,
-                # if not already assigned to a previous sample.
-                # It will be the previous testing sample number in any
-                # possible case (scenario D below), or nothing.
-                if closest_samp_num and (not ref_samp_num or closest_samp_num - 1 != self.matching_sample_nums[ref_samp_num - 1]):
-                    # The previous test annotation is inspected
-                    closest_samp_num = closest_samp_num - 1
-                    smallest_samp_diff = abs(self.ref_sample[ref_samp_num]
-                        - self.test_sample[closest_samp_num])
-                    # Assign the reference-test pair if close enough
-                    if smallest_samp_diff < self.window_width:
-                        self.matching_sample_nums[ref_samp_num] = closest_samp_num
-                    # Set the starting test sample number to inspect
-                    # for the next reference sample.
-                    test_samp_num = closest_samp_num + 1
-
-                # Otherwise there is no matching test annotation
-
-            # If there is no clash, or the contested test sample is
-            # closer to the current reference, keep the test sample
-            # for this reference sample.
-            else:
+        self._calc_stats()
+
+    def _match_ref(self, ref_samp_num, test_samp_num):
+        """
+        Match a reference sample number, searching from the given
+        testing sample number. Returns the testing sample number to
+        start the search from for the next reference sample.
+        """
+        # Get the closest testing sample number for this reference sample
+        closest_samp_num, smallest_samp_diff = (
+            self._get_closest_samp_num(ref_samp_num, test_samp_num))
+        # Get the closest testing sample number for the next reference
+        # sample. This doesn't need to be called for the last index.
+        if ref_samp_num < self.n_ref - 1:
+            closest_samp_num_next, smallest_samp_diff_next = (
+                self._get_closest_samp_num(ref_samp_num + 1, test_samp_num))
+        else:
+            # Set non-matching value if there is no next reference sample
+            # to compete for the test sample
+            closest_samp_num_next = -1
+
+        # Found a contested test sample number. Decide which
+        # reference sample it belongs to. If the sample is closer to
+        # the next reference sample, leave it to the next reference
+        # sample and label this reference sample as unmatched.
+        if (closest_samp_num == closest_samp_num_next
+                and smallest_samp_diff_next < smallest_samp_diff):
+            # Get the next closest sample for this reference sample,
+            # if not already assigned to a previous sample.
+            # It will be the previous testing sample number in any
+            # possible case (scenario D below), or nothing.
+            if closest_samp_num and (not ref_samp_num or closest_samp_num - 1 != self.matching_sample_nums[ref_samp_num - 1]):
+                # The previous test annotation is inspected
+                closest_samp_num = closest_samp_num - 1
+                smallest_samp_diff = abs(self.ref_sample[ref_samp_num]
+                    - self.test_sample[closest_samp_num])
                 # Assign the reference-test pair if close enough
                 if smallest_samp_diff < self.window_width:
                     self.matching_sample_nums[ref_samp_num] = closest_samp_num
-                # Increment the starting test sample number to inspect
+                # Set the starting test sample number to inspect
                 # for the next reference sample.
                 test_samp_num = closest_samp_num + 1
 
-            ref_samp_num += 1
+            # Otherwise there is no matching test annotation
 
-        self._calc_stats()
+        # If there is no clash, or the contested test sample is
+        # closer to the current reference, keep the test sample
+        # for this reference sample.
+        else:
+            # Assign the reference-test pair if close enough
+            if smallest_samp_diff < self.window_width:
+                self.matching_sample_nums[ref_samp_num] = closest_samp_num
+            # Increment the starting test sample number to inspect
+            # for the next reference sample.
+            test_samp_num = closest_samp_num + 1
 
+        return test_samp_num
 
     def _get_closest_samp_num(self, ref_samp_num, start_test_samp_num):
         """
@@ -207,28 +291,27 @@ class Comparitor(object):
             raise ValueError('Invalid starting test sample number.')
 
         ref_samp = self.ref_sample[ref_samp_num]
-        test_samp = self.test_sample[start_test_samp_num]
-        samp_diff = ref_samp - test_samp
-
-        # Initialize running parameters
-        closest_samp_num = start_test_samp_num
-        smallest_samp_diff = abs(samp_diff)
-
-        # Iterate through the testing samples
-        for test_samp_num in range(start_test_samp_num, self.n_test):
-            test_samp = self.test_sample[test_samp_num]
-            samp_diff = ref_samp - test_samp
-            abs_samp_diff = abs(samp_diff)
 
-            # Found a better match
+        # The search stops at the first test sample at or after the
+        # reference sample
+        after = max(np.searchsorted(self.test_sample, ref_samp),
+                    start_test_samp_num)
+        if after == start_test_samp_num:
+            return after, abs(ref_samp - self.test_sample[after])
+
+        # The first of the closest test samples before it
+        closest_samp_num = max(np.searchsorted(self.test_sample,
+                                               self.test_sample[after - 1]),
+                               start_test_samp_num)
+        smallest_samp_diff = abs(ref_samp - self.test_sample[closest_samp_num])
+
+        # Found a better match
+        if after < self.n_test:
+            abs_samp_diff = abs(ref_samp - self.test_sample[after])
             if abs_samp_diff < smallest_samp_diff:
-                closest_samp_num = test_samp_num
+                closest_samp_num = after
                 smallest_samp_diff = abs_samp_diff
 
-            # Stop iterating when the ref sample is first passed or reached
-            if samp_diff <= 0:
-                break
-
         return closest_samp_num, smallest_samp_diff
 
     def print_summary(self):
@@ -381,10 +464,25 @@ def compare_annotations(ref_sample, test_sample, window_width, signal=None):
     return comparitor
 
 
-def benchmark_mitdb(detector, verbose=False, print_results=False):
+def benchmark_mitdb(detector, verbose=False, print_results=False,
+                    db_dir=None, cache_dir=None, records='all', workers=None,
+                    executor=None, trace_memory=True):
     """
     Benchmark a qrs detector against mitdb's records.
 
+    The records are streamed from Physiobank, unless a local copy of the
+    database is given with `db_dir` or `cache_dir`. Along with its
+    accuracy stats, the Comparitor of each record holds the performance
+    of the detector on the record, in the attributes:
+
+    - wall_time : the time in seconds taken to read, detect and compare
+      the record.
+    - detector_time : the time in seconds taken by the detector.
+    - samples_per_second : the number of signal samples processed per
+      second by the detector.
+    - peak_memory : the peak memory in bytes allocated by the detector,
+      or None if `trace_memory` is False.
+
     Parameters
     ----------
     detector : function
@@ -394,6 +492,31 @@ def benchmark_mitdb(detector, verbose=False, print_results=False):
     print_results : bool, optional
         Whether to print the overall performance, and the results for
         each record.
+    db_dir : str, optional
+        A local directory containing the mitdb records and their 'atr'
+        annotation files, to read the records from. The records are
+        those listed in its RECORDS file, or if there is none, those with
+        a header and an 'atr' file.
+    cache_dir : str, optional
+        A local directory holding a cached copy of the database. If any
+        of the records are missing from it, they are first downloaded
+        into it with `dl_database`. The records are then read from it, so
+        later runs do not need a network connection.
+    records : list, or 'all', optional
+        A list of the record names to benchmark. Leave as 'all' to use all
+        the records of the database.
+    workers : int, optional
+        The number of worker processes. Defaults to the number of CPUs
+        minus one. If 1, the records are processed in the calling
+        process.
+    executor : object, optional
+        An executor with a `map(fn, *iterables)` method, such as a
+        `concurrent.futures` executor, to process the records with
+        instead of a multiprocessing pool. Overrides `workers`.
+    trace_memory : bool, optional
+        Whether to measure the peak memory allocated by the detector. The
+        detector is run a second time on each record with `tracemalloc`
+        tracing its allocations, so that the timings are not affected.
 
     Returns
     -------
@@ -420,17 +543,50 @@ def benchmark_mitdb(detector, verbose=False, print_results=False):
 
     >>> comparitors, spec, pp, fpr = benchmark_mitdb(xqrs_detect)
 
+    >>> # Keep a local copy of the database, and benchmark offline
+    >>> comparitors, spec, pp, fpr = benchmark_mitdb(
+            xqrs_detect, cache_dir='mitdb', workers=4)
+    >>> comparitors['100'].samples_per_second
+
     """
-    record_list = get_record_list('mitdb')
+    if cache_dir is not None:
+        # The RECORDS file is written once the whole database is cached
+        record_list = None
+        if records != 'all' or os.path.isfile(os.path.join(cache_dir,
+                                                           'RECORDS')):
+            record_list = get_local_record_list(cache_dir, records)
+        if record_list is None or any(
+                not os.path.isfile(os.path.join(cache_dir, rec + ext))
+                for rec in record_list for ext in ['.hea', '.dat', '.atr']):
+            record_list = get_record_list('mitdb', records)
+            dl_database('mitdb', cache_dir, records=record_list,
+                        annotators=['atr'])
+            if records == 'all':
+                with open(os.path.join(cache_dir, 'RECORDS'), 'w') as f:
+                    f.write('\n'.join(record_list) + '\n')
+        db_dir = cache_dir
+    elif db_dir is not None:
+        record_list = get_local_record_list(db_dir, records)
+        if record_list is None:
+            raise ValueError('The directory %s has no mitdb records' % db_dir)
+    else:
+        record_list = get_record_list('mitdb', records)
     n_records = len(record_list)
 
     # Function arguments for starmap
-    args = zip(record_list, n_records * [detector], n_records * [verbose])
+    args = list(zip(record_list, n_records * [detector],
+                    n_records * [verbose], n_records * [db_dir],
+                    n_records * [trace_memory]))
 
     # Run detector and compare against reference annotations for all
     # records
-    with Pool(cpu_count() - 1) as p:
-        comparitors = p.starmap(benchmark_mitdb_record, args)
+    if executor is not None:
+        comparitors = list(executor.map(benchmark_mitdb_record, *zip(*args)))
+    elif workers == 1:
+        comparitors = [benchmark_mitdb_record(*a) for a in args]
+    else:
+        with Pool(workers or cpu_count() - 1) as p:
+            comparitors = p.starmap(benchmark_mitdb_record, args)
 
     # Calculate aggregate stats
     specificity = np.mean([c.specificity for c in comparitors])
@@ -446,26 +602,85 @@ def benchmark_mitdb(detector, verbose=False, print_results=False):
     if print_results:
         print('\nOverall MITDB Performance - Specificity: %.4f, Positive Predictivity: %.4f, False Positive Rate: %.4f\n'
               % (specificity, positive_predictivity, false_positive_rate))
+        detector_time = sum(c.detector_time for c in comparitors.values())
+        n_samples = sum(c.n_samples for c in comparitors.values())
+        print('Total Detector Time: %.3f s, Samples per Second: %.0f\n'
+              % (detector_time, n_samples / detector_time))
         for record_name in record_list:
+            comparitor = comparitors[record_name]
             print('Record %s:' % record_name)
-            comparitors[record_name].print_summary()
+            comparitor.print_summary()
+            print('Wall Time: %.3f s, Detector Time: %.3f s, Samples per Second: %.0f'
+                  % (comparitor.wall_time, comparitor.detector_time,
+                     comparitor.samples_per_second))
+            if comparitor.peak_memory is not None:
+                print('Peak Detector Memory: %.1f MB'
+                      % (comparitor.peak_memory / 1e6))
             print('\n\n')
 
     return comparitors, specificity, positive_predictivity, false_positive_rate
 
 
-def benchmark_mitdb_record(rec, detector, verbose):
+def get_local_record_list(db_dir, records='all'):
     """
-    Benchmark a single mitdb record
+    Get the list of records in a local database directory: those listed
+    in its RECORDS file, or if there is none, those with a header and an
+    'atr' annotation file. Returns None if no records are found.
     """
-    sig, fields = rdsamp(rec, pb_dir='mitdb', channels=[0])
-    ann_ref = rdann(rec, pb_dir='mitdb', extension='atr')
+    if records != 'all':
+        return list(records)
+
+    records_file = os.path.join(db_dir, 'RECORDS')
+    if os.path.isfile(records_file):
+        with open(records_file) as f:
+            return f.read().split()
 
+    if not os.path.isdir(db_dir):
+        return None
+    record_list = sorted(
+        file_name[:-4] for file_name in os.listdir(db_dir)
+        if file_name.endswith('.hea')
+        and os.path.isfile(os.path.join(db_dir, file_name[:-4] + '.atr')))
+
+    return record_list or None
+
+
+def benchmark_mitdb_record(rec, detector, verbose, db_dir=None,
+                           trace_memory=False):
+    """
+    Benchmark a single mitdb record, read from Physiobank, or from the
+    local directory db_dir.
+    """
+    t_start = time.time()
+    if db_dir is None:
+        sig, fields = rdsamp(rec, pb_dir='mitdb', channels=[0])
+        ann_ref = rdann(rec, pb_dir='mitdb', extension='atr')
+    else:
+        sig, fields = rdsamp(os.path.join(db_dir, rec), channels=[0])
+        ann_ref = rdann(os.path.join(db_dir, rec), extension='atr')
+
+    t_detector = time.time()
     qrs_inds = detector(sig=sig[:,0], fs=fields['fs'], verbose=verbose)
+    detector_time = time.time() - t_detector
 
     comparitor = compare_annotations(ref_sample=ann_ref.sample[1:],
                                      test_sample=qrs_inds,
                                      window_width=int(0.1 * fields['fs']))
+    comparitor.wall_time = time.time() - t_start
+    comparitor.detector_time = detector_time
+    comparitor.n_samples = sig.shape[0]
+    comparitor.samples_per_second = sig.shape[0] / max(detector_time, 1e-9)
+
+    # Run the detector again to trace its memory use
+    comparitor.peak_memory = None
+    if trace_memory:
+        # Only available in python 3
+        import tracemalloc
+        tracemalloc.start()
+        detector(sig=sig[:,0], fs=fields['fs'], verbose=False)
+        comparitor.peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
     if verbose:
         print('Finished record %s' % rec)
     return comparitor
@@ -1,7 +1,7 @@
 import numpy as np
 
 
-def compute_hr(sig_len, qrs_inds, fs):
+def compute_hr(sig_len, qrs_inds, fs, downsample=1):
     """
     Compute instantaneous heart rate from peak indices.
 
@@ -13,30 +13,53 @@ def compute_hr(sig_len, qrs_inds, fs):
         The qrs index locations
     fs : int, or float
         The corresponding signal's sampling frequency.
+    downsample : int, optional
+        If above 1, only the heart rate at every `downsample`th sample
+        is returned, ie. `heart_rate[::downsample]`, without creating
+        the full length array. For example, `int(fs)` gives a heart rate
+        trend with one value per second.
 
     Returns
     -------
     heart_rate : numpy array
-        An array of the instantaneous heart rate, with the length of the
-        corresponding signal. Contains numpy.nan where heart rate could
-        not be computed.
+        A float32 array of the instantaneous heart rate, with the length
+        of the corresponding signal, or of its downsampled samples.
+        Contains numpy.nan where heart rate could not be computed.
 
     """
-    heart_rate = np.full(sig_len, np.nan, dtype='float32')
+    qrs_inds = np.asarray(qrs_inds)
+    samples = np.arange(0, sig_len, downsample)
 
     if len(qrs_inds) < 2:
-        return heart_rate
-
-    for i in range(0, len(qrs_inds)-2):
-        a = qrs_inds[i]
-        b = qrs_inds[i+1]
-        c = qrs_inds[i+2]
-        rr = (b-a) * (1.0 / fs) * 1000
-        hr = 60000.0 / rr
-        heart_rate[b+1:c+1] = hr
-
-    heart_rate[qrs_inds[-1]:] = heart_rate[qrs_inds[-1]]
-
+        return np.full(len(samples), np.nan, dtype='float32')
+
+    # The heart rate of each rr interval applies from the sample after
+    # its end, up to the end of the following interval.
+    rr = np.diff(qrs_inds)
+    hr = (60000.0 / (rr[:-1] * (1.0 / fs) * 1000)).astype('float32')
+
+    # Unordered intervals overlap, and are overwritten in order. The
+    # last qrs must also be within the signal.
+    if qrs_inds[0] < 0 or qrs_inds[-1] >= sig_len or np.any(rr < 0):
+        heart_rate = np.full(sig_len, np.nan, dtype='float32')
+        for i in range(len(hr)):
+            heart_rate[qrs_inds[i+1]+1:qrs_inds[i+2]+1] = hr[i]
+        heart_rate[qrs_inds[-1]:] = heart_rate[qrs_inds[-1]]
+        return heart_rate[::downsample]
+
+    # The index of the interval which applies at each sample, which is
+    # negative before any. After the last qrs, the heart rate at the
+    # last qrs is kept.
+    values = np.concatenate([[np.nan], hr]).astype('float32')
+    last_ind = np.searchsorted(qrs_inds, qrs_inds[-1]) - 2
+
+    if downsample == 1:
+        bounds = np.concatenate([[0], qrs_inds[1:] + 1, [sig_len]])
+        values = np.append(values, values[max(last_ind, -1) + 1])
+        return np.repeat(values, np.diff(bounds))
+
+    hr_inds = np.searchsorted(qrs_inds, np.minimum(samples, qrs_inds[-1])) - 2
+    heart_rate = values[np.maximum(hr_inds, -1) + 1]
     return heart_rate
 
 
@@ -1,5 +1,6 @@
 import copy
 import numpy as np
+from scipy.ndimage import maximum_filter1d
 
 from .basic import smooth
 
@@ -39,19 +40,15 @@ def find_peaks(sig):
     tmp = tmp-tmp2
 
     hard_peaks = np.where(np.logical_or(tmp==-2, tmp==+2))[0] + 1
-    soft_peaks = []
-
-    for iv in np.where(np.logical_or(tmp==-1,tmp==+1))[0]:
-        t = tmp[iv]
-        i = iv+1
-        while True:
-            if i==len(tmp) or tmp[i] == -t or tmp[i] == -2 or tmp[i] == 2:
-                break
-            if tmp[i] == t:
-                soft_peaks.append(int(iv + (i - iv)/2))
-                break
-            i += 1
-    soft_peaks = np.array(soft_peaks, dtype='int') + 1
+
+    # A soft peak starts with a +-1 change in slope, and is closed by the
+    # next change if it is the same. The middle of the plateau is taken.
+    changes = np.where(np.abs(tmp) >= 1)[0]
+    change_vals = tmp[changes]
+    is_soft = (np.abs(change_vals[:-1]) == 1) & (change_vals[1:] == change_vals[:-1])
+    starts = changes[:-1][is_soft]
+    ends = changes[1:][is_soft]
+    soft_peaks = (starts + (ends - starts) // 2).astype('int') + 1
 
     return hard_peaks, soft_peaks
 
@@ -64,6 +61,12 @@ def find_local_peaks(sig, radius):
     In cases where it shares the max value with nearby samples, the
     middle sample is classified as the local peak.
 
+    The signal is scanned from left to right. A sample is compared with
+    the maximum of the samples from `radius` on its left to
+    `radius - 1` on its right, truncated at the signal boundaries. After
+    a peak is found, the following `radius - 1` samples are skipped, so
+    that peaks are at least `radius` samples apart.
+
     Parameters
     ----------
     sig : numpy array
@@ -76,29 +79,20 @@ def find_local_peaks(sig, radius):
     if np.min(sig) == np.max(sig):
         return np.empty(0)
 
-    peak_inds = []
-
-    i = 0
-    while i < radius + 1:
-        if sig[i] == max(sig[:i + radius]):
-            peak_inds.append(i)
-            i += radius
-        else:
-            i += 1
-
-    while i < len(sig):
-        if sig[i] == max(sig[i - radius:i + radius]):
-            peak_inds.append(i)
-            i += radius
-        else:
-            i += 1
+    # Sliding window maximum. Padding with the signal minimum leaves the
+    # windows truncated at the boundaries, since every window contains
+    # its own sample.
+    sig_max = maximum_filter1d(sig, size=2 * radius, mode='constant',
+                               cval=np.min(sig))
+    candidates = np.flatnonzero(sig == sig_max)
 
-    while i < len(sig):
-        if sig[i] == max(sig[i - radius:]):
+    # Apply the skip-ahead to the candidate samples
+    peak_inds = []
+    next_ind = 0
+    for i in candidates.tolist():
+        if i >= next_ind:
             peak_inds.append(i)
-            i += radius
-        else:
-            i += 1
+            next_ind = i + radius
 
     return (np.array(peak_inds))
 
@@ -193,30 +187,56 @@ def shift_peaks(sig, peak_inds, search_radius, peak_up):
     Helper function for correct_peaks. Return the shifted peaks to local
     maxima or minima within a radius.
 
+    The windows of all the peaks are gathered from a strided view of
+    the signal, in chunks of peaks to bound the memory used, and
+    searched at once.
+
     peak_up : bool
         Whether the expected peak direction is up
     """
+    sig = np.asarray(sig)
+    peak_inds = np.asarray(peak_inds)
     sig_len = sig.shape[0]
     n_peaks = len(peak_inds)
     # The indices to shift each peak ind by
     shift_inds = np.zeros(n_peaks, dtype='int')
 
-    # Iterate through peaks
-    for i in range(n_peaks):
-        ind = peak_inds[i]
-        local_sig = sig[max(0, ind - search_radius):min(ind + search_radius, sig_len-1)]
-
+    # The window of each peak spans search_radius samples on its left
+    # and search_radius - 1 on its right, truncated at the start of the
+    # signal and before its last sample. Pad the signal with values
+    # that can never be selected, so that every window has the same
+    # length, and view the windows without copying.
+    fill = -np.inf if peak_up else np.inf
+    window_len = 2 * search_radius
+    sig_pad = np.concatenate([np.full(window_len, fill), sig[:sig_len - 1],
+                              np.full(window_len, fill)])
+    windows = np.lib.stride_tricks.as_strided(
+        sig_pad, shape=(len(sig_pad) - window_len + 1, window_len),
+        strides=(sig_pad.strides[0], sig_pad.strides[0]), writeable=False)
+
+    if n_peaks and (peak_inds.min() <= -search_radius
+                    or peak_inds.max() >= sig_len - 1 + search_radius):
+        raise ValueError('attempt to get argmax of an empty sequence')
+
+    # Limit the size of the gathered windows
+    chunk_size = max(1, 2**20 // max(window_len, 1))
+
+    for chunk_start in range(0, n_peaks, chunk_size):
+        chunk_inds = peak_inds[chunk_start:chunk_start + chunk_size]
+        local_sigs = windows[chunk_inds + search_radius]
         if peak_up:
-            shift_inds[i] = np.argmax(local_sig)
+            local_shifts = np.argmax(local_sigs, axis=1)
         else:
-            shift_inds[i] = np.argmin(local_sig)
+            local_shifts = np.argmin(local_sigs, axis=1)
+
+        # Measure the shifts from the start of the truncated windows
+        shift_inds[chunk_start:chunk_start + chunk_size] = (
+            local_shifts - np.maximum(search_radius - chunk_inds, 0))
 
     # May have to adjust early values
-    for i in range(n_peaks):
-        ind = peak_inds[i]
-        if ind >= search_radius:
-            break
-        shift_inds[i] -= search_radius - ind
+    late_peaks = np.flatnonzero(peak_inds >= search_radius)
+    n_early = late_peaks[0] if late_peaks.size else n_peaks
+    shift_inds[:n_early] -= search_radius - peak_inds[:n_early]
 
     shifted_peak_inds = peak_inds + shift_inds - search_radius
 